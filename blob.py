@@ -0,0 +1,277 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the functions used to find the blobs of a flattened board.
+
+A blob is a connected group of unit cells of the same colour, where cells are
+connected if they share an edge. Blobs are labelled without recursion, with
+the two passes of a union-find labelling. The first pass splits each column
+into runs of cells of the same colour, and joins each run to the runs of the
+same colour beside it in the previous column. The second pass adds up the
+cells of the runs joined into each blob.
+
+Blobs can also be found without flattening a Block. A BlobSummary describes
+the blobs of one colour in a block by what can still change when the block is
+joined to the blocks beside it: the blobs that touch its edges. The summary
+of a parent is merged from the summaries of its children along the seams
+between them, so a Block can cache them and only merge the summaries along
+the path to a block that moved.
+"""
+from __future__ import annotations
+from itertools import groupby
+from typing import Any, Collection, Dict, List, NamedTuple, Optional, \
+    Sequence, Tuple
+
+
+def column_runs(column: Sequence[Any]) -> List[Tuple[int, int, Any]]:
+    """Return the runs of equal values in <column>, from the top down, as
+    tuples (start, end, value) where the run covers rows start to end - 1.
+
+    >>> column_runs(['a', 'a', 'b', 'a'])
+    [(0, 2, 'a'), (2, 3, 'b'), (3, 4, 'a')]
+    """
+    runs = []
+    start = 0
+    for value, group in groupby(column):
+        end = start + len(list(group))
+        runs.append((start, end, value))
+        start = end
+    return runs
+
+
+def _find(parents: List[int], run: int) -> int:
+    """Return the representative of the set that <run> is in, halving the
+    path to it along the way.
+    """
+    while parents[run] != run:
+        parents[run] = parents[parents[run]]
+        run = parents[run]
+    return run
+
+
+def largest_blobs(grid: Sequence[Sequence[Any]],
+                  values: Optional[Collection[Any]] = None) -> Dict[Any, int]:
+    """Return the number of unit cells in the largest blob of each value in
+    <grid>.
+
+    <grid> is a list of columns, as returned by goal._flatten. If <values> is
+    given, only the blobs of those values are measured, and every value in
+    <values> is in the result, with 0 if it is not in <grid>.
+
+    >>> largest_blobs([['a', 'b'], ['a', 'a']])
+    {'a': 3, 'b': 1}
+    """
+    parents = []
+    lengths = []
+    run_values = []
+    previous = []
+    for column in grid:
+        current = []
+        for start, end, value in column_runs(column):
+            run = len(parents)
+            parents.append(run)
+            lengths.append(end - start)
+            run_values.append(value)
+            current.append((start, end, value, run))
+        i = 0
+        j = 0
+        while i < len(previous) and j < len(current):
+            left = previous[i]
+            right = current[j]
+            # Runs visited together always overlap, since the runs of both
+            # columns cover every row in order.
+            if left[2] == right[2] and (values is None or left[2] in values):
+                first = _find(parents, left[3])
+                second = _find(parents, right[3])
+                if first != second:
+                    parents[second] = first
+            if left[1] <= right[1]:
+                i += 1
+            if right[1] <= left[1]:
+                j += 1
+        previous = current
+
+    totals = [0] * len(parents)
+    for run in range(len(parents)):
+        if values is None or run_values[run] in values:
+            totals[_find(parents, run)] += lengths[run]
+    best = {} if values is None else {value: 0 for value in values}
+    for run in range(len(parents)):
+        if totals[run] > best.get(run_values[run], 0):
+            best[run_values[run]] = totals[run]
+    return best
+
+
+class BlobSummary(NamedTuple):
+    """The blobs of one colour in a square block, as seen from its edges.
+
+    Each edge is a list of runs (length, label) that together cover the edge
+    from left to right or from top to bottom. <label> is the blob of the
+    colour that the cells of the run are in, or -1 if they are not of the
+    colour. <areas>[label] is the number of unit cells in blob <label>, and
+    <best> is the number of unit cells in the largest blob that does not
+    touch an edge.
+    """
+    top: List[Tuple[int, int]]
+    bottom: List[Tuple[int, int]]
+    left: List[Tuple[int, int]]
+    right: List[Tuple[int, int]]
+    areas: List[int]
+    best: int
+
+    def largest(self) -> int:
+        """Return the number of unit cells in the largest blob.
+        """
+        return max(self.best, max(self.areas, default=0))
+
+
+def leaf_summary(cells: int, matches: bool) -> BlobSummary:
+    """Return the summary of a leaf of <cells> by <cells> unit cells, which
+    is of the colour iff <matches>.
+    """
+    if matches:
+        edge = [(cells, 0)]
+        return BlobSummary(edge, edge, edge, edge, [cells * cells], 0)
+    edge = [(cells, -1)]
+    return BlobSummary(edge, edge, edge, edge, [], 0)
+
+
+def turn_summary(summary: BlobSummary, turns: int) -> BlobSummary:
+    """Return the summary of a block after <turns> clockwise quarter turns,
+    where <summary> is its summary before them.
+    """
+    for _ in range(turns % 4):
+        # The left edge becomes the top edge read backwards, the top edge
+        # becomes the right edge, and so on around the block.
+        summary = BlobSummary(summary.left[::-1], summary.right[::-1],
+                              summary.bottom, summary.top, summary.areas,
+                              summary.best)
+    return summary
+
+
+def _join_seam(parents: List[int], first: List[Tuple[int, int]],
+               first_offset: int, second: List[Tuple[int, int]],
+               second_offset: int) -> None:
+    """Join the blobs on either side of a seam, where <first> and <second>
+    are the two edges that meet at the seam and the labels of each are
+    shifted by its offset.
+    """
+    i = 0
+    j = 0
+    first_end = first[0][0]
+    second_end = second[0][0]
+    while True:
+        # Runs i and j overlap along the seam.
+        if first[i][1] >= 0 and second[j][1] >= 0:
+            root_first = _find(parents, first[i][1] + first_offset)
+            root_second = _find(parents, second[j][1] + second_offset)
+            if root_first != root_second:
+                parents[root_second] = root_first
+        if first_end == second_end:
+            i += 1
+            j += 1
+            if i == len(first):
+                return
+            first_end += first[i][0]
+            second_end += second[j][0]
+        elif first_end < second_end:
+            i += 1
+            first_end += first[i][0]
+        else:
+            j += 1
+            second_end += second[j][0]
+
+
+def merge_summaries(children: List[BlobSummary]) -> BlobSummary:
+    """Return the summary of a block whose children, in the usual order of
+    upper-right, upper-left, lower-left and lower-right, have the summaries
+    <children>.
+    """
+    upper_right, upper_left, lower_left, lower_right = children
+    offsets = []
+    areas = []
+    for child in children:
+        offsets.append(len(areas))
+        areas.extend(child.areas)
+    parents = list(range(len(areas)))
+    if areas:
+        _join_seam(parents, upper_left.right, offsets[1], upper_right.left,
+                   offsets[0])
+        _join_seam(parents, lower_left.right, offsets[2], lower_right.left,
+                   offsets[3])
+        _join_seam(parents, upper_left.bottom, offsets[1], lower_left.top,
+                   offsets[2])
+        _join_seam(parents, upper_right.bottom, offsets[0], lower_right.top,
+                   offsets[3])
+
+    totals = [0] * len(areas)
+    for label in range(len(areas)):
+        totals[_find(parents, label)] += areas[label]
+
+    labels = {}
+    edges = []
+    for pieces in [[(upper_left.top, 1), (upper_right.top, 0)],
+                   [(lower_left.bottom, 2), (lower_right.bottom, 3)],
+                   [(upper_left.left, 1), (lower_left.left, 2)],
+                   [(upper_right.right, 0), (lower_right.right, 3)]]:
+        edge = []
+        for runs, child in pieces:
+            for length, label in runs:
+                if label >= 0:
+                    root = _find(parents, label + offsets[child])
+                    if root not in labels:
+                        labels[root] = len(labels)
+                    label = labels[root]
+                if edge and edge[-1][1] == label:
+                    edge[-1] = (edge[-1][0] + length, label)
+                else:
+                    edge.append((length, label))
+        edges.append(edge)
+
+    new_areas = [0] * len(labels)
+    for root, label in labels.items():
+        new_areas[label] = totals[root]
+    best = max(child.best for child in children)
+    for label in range(len(areas)):
+        if parents[label] == label and label not in labels:
+            best = max(best, totals[label])
+    return BlobSummary(edges[0], edges[1], edges[2], edges[3], new_areas,
+                       best)
+
+
+def largest_blob(grid: Sequence[Sequence[Any]], value: Any) -> int:
+    """Return the number of unit cells in the largest blob of <value> in
+    <grid>, or 0 if <value> is not in <grid>.
+
+    >>> largest_blob([['a', 'b'], ['b', 'b']], 'a')
+    1
+    """
+    return largest_blobs(grid, [value])[value]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'itertools'
+        ]
+    })
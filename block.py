@@ -22,11 +22,101 @@ Misha Schwartz, and Jaisie Sin
 This file contains the Block class, the main data structure used in the game.
 """
 from __future__ import annotations
-from typing import Optional, Tuple, List
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 import random
 import math
 
+from blob import BlobSummary, leaf_summary, merge_summaries, turn_summary
 from settings import colour_name, COLOUR_LIST
+from traversal import preorder, preorder_pairs
+
+
+def _compose(first: Tuple[int, ...], second: Tuple[int, ...]) -> \
+        Tuple[int, ...]:
+    """Return the order of four children that results from reordering them by
+    <first> and then by <second>.
+
+    An order (a, b, c, d) moves the child at index a to index 0, the child at
+    index b to index 1, and so on.
+    """
+    return tuple(first[i] for i in second)
+
+
+def _orientations() -> List[Tuple[int, ...]]:
+    """Return the eight orders of four children reachable by rotating and
+    swapping, indexed by orientation.
+
+    Orientation t + 4 * m is <m> horizontal swaps followed by <t> clockwise
+    quarter turns.
+    """
+    clockwise = (1, 2, 3, 0)
+    orders = []
+    for mirror in [(0, 1, 2, 3), (1, 0, 3, 2)]:
+        order = mirror
+        for _ in range(4):
+            orders.append(order)
+            order = _compose(order, clockwise)
+    return orders
+
+
+# The order of the children for each orientation, and the orientation that
+# results from applying one orientation and then another.
+_ORDERS = _orientations()
+_COMPOSE = [[_ORDERS.index(_compose(first, second)) for second in _ORDERS]
+            for first in _ORDERS]
+
+# The orientation applied by swap, indexed by direction.
+_SWAP_ORIENTATION = {0: 4, 1: 6}
+
+# Structural hashes are kept to 64 bits.
+_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def _mix(value: int) -> int:
+    """Return a well-mixed 64-bit hash of the 64-bit integer <value>.
+
+    This is the finalizer of the SplitMix64 random number generator.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def _leaf_hash(level: int, colour: int) -> int:
+    """Return the structural hash of a leaf of <colour> at <level>.
+    """
+    return _mix((hash(colour) & _MASK) ^ (level << 56))
+
+
+def _parent_hash(level: int, child_hashes: List[int]) -> int:
+    """Return the structural hash of a block at <level> whose children, in
+    order, have the structural hashes <child_hashes>.
+    """
+    value = _mix(level + 0x5EED)
+    for child_hash in child_hashes:
+        value = _mix(value ^ child_hash)
+    return value
+
+
+class BlockChange(NamedTuple):
+    """A record of a move that changed a Block, sent to the observers of the
+    Block and of its ancestors.
+
+    <action> and <direction> are those of the move, as in the actions module,
+    and <block> is the Block that was moved. <action> is 'restore' when an
+    undo or redo puts back the colour and children that <block> had earlier.
+
+    The unit cells that may have changed are the <cells> by <cells> square
+    whose upper left unit cell is at <column> and <row> of the root of the
+    tree that <block> is in.
+    """
+    action: str
+    direction: Optional[int]
+    block: Block
+    column: int
+    row: int
+    cells: int
 
 
 def generate_board(max_depth: int, size: int) -> Block:
@@ -59,14 +149,40 @@ class Block:
     child's position. Indices 0, 1, 2, and 3 are the upper-right child,
     upper-left child, lower-left child, and lower-right child, respectively.
 
+    Every Block has a 64-bit structural hash that depends only on its level,
+    its colour and its descendants, so equivalent Blocks have equal hashes.
+    Each Block caches its hash, and a move only clears the cached hashes of
+    the moved Block and its ancestors. A Block must not be moved while it is
+    used as a key in a dict or set.
+
+    Positions and orientations are derived lazily. Moving a Block only
+    records how its children need to be reordered and placed, and this is
+    applied the next time <children> is accessed. Rotating a Block records a
+    number of quarter turns that is passed on to its children in the same way.
+    A Block reached from the root through <children> therefore always has the
+    correct position and children. A Block that is kept across other moves
+    catches up with the moves recorded on its ancestors when it is moved, or
+    when refresh is called.
+
+    Functions subscribed to a Block are called with a BlockChange after every
+    successful smash, swap, rotate, paint or combine of that Block or of any
+    of its descendants.
+
+    <position> and <size> are in pixels and are only used to draw the board.
+    They are rounded at every level, so they are not exact on deep boards,
+    and they round down to 0 below the level where a block is one pixel wide:
+    level 10 on a board of 750 pixels. The rest of the game works with unit
+    cells, the size of a block at max_depth, whose coordinates are always
+    exact integers.
+
     === Public Attributes ===
     position:
         The (x, y) coordinates of the upper left corner of this Block.
     size:
         The height and width of this square Block.
     colour:
-        If this block is not subdivided, <colour> stores its colour. Otherwise,
-        <colour> is None.
+        If this block is not subdivided, <colour> stores its colour, as an
+        index into settings.PALETTE. Otherwise, <colour> is None.
     level:
         The level of this block within the overall block structure.
         The outermost block, corresponding to the root of the tree,
@@ -92,15 +208,54 @@ class Block:
         - its colour is not None.
     - level <= max_depth
     """
+    # === Private Attributes ===
+    # _children:
+    #   The list of children returned by <children>.
+    # _parent:
+    #   The Block that this Block is a child of, or None if this Block is the
+    #   root or has not been placed by a parent yet.
+    # _colour:
+    #   The colour returned by <colour>.
+    # _hashes:
+    #   The structural hash of this Block after 0, 1, 2 and 3 clockwise
+    #   quarter turns, or None if it needs to be computed again. If this is
+    #   None, it is also None for every ancestor.
+    # _stale:
+    #   True iff the positions of the children may not be consistent with the
+    #   position of this Block and their order in <_children>.
+    # _orientation:
+    #   The orientation, from 0 to 7, that has yet to be applied to the order
+    #   of <_children>. 0 to 3 are quarter turns clockwise, and 4 to 7 are the
+    #   same turns after a horizontal swap.
+    # _turns:
+    #   The number of clockwise quarter turns that has yet to be applied to
+    #   each child.
+    # _observers:
+    #   The functions subscribed to this Block, or None if there are none.
+    # _summaries:
+    #   The cached BlobSummary of this Block for each colour it was asked
+    #   for, or None if they need to be computed again. If this is None, it is
+    #   also None for every ancestor.
+    # _summary_turns:
+    #   The number of clockwise quarter turns that has yet to be applied to
+    #   every summary in <_summaries>.
     position: Tuple[int, int]
     size: int
-    colour: Optional[Tuple[int, int, int]]
     level: int
     max_depth: int
-    children: List[Block]
+    _children: List[Block]
+    _parent: Optional[Block]
+    _colour: Optional[int]
+    _hashes: Optional[Tuple[int, int, int, int]]
+    _stale: bool
+    _orientation: int
+    _turns: int
+    _observers: Optional[List[Callable[[BlockChange], None]]]
+    _summaries: Optional[Dict[int, BlobSummary]]
+    _summary_turns: int
 
     def __init__(self, position: Tuple[int, int], size: int,
-                 colour: Optional[Tuple[int, int, int]], level: int,
+                 colour: Optional[int], level: int,
                  max_depth: int) -> None:
         """Initialize this block with <position>, dimensions <size> by <size>,
         the given <colour>, at <level>, and with no children.
@@ -113,52 +268,198 @@ class Block:
         """
         self.position = position
         self.size = size
-        self.colour = colour
         self.level = level
         self.max_depth = max_depth
-        self.children = []
+        self._children = []
+        self._parent = None
+        self._colour = colour
+        self._hashes = None
+        self._stale = False
+        self._orientation = 0
+        self._turns = 0
+        self._observers = None
+        self._summaries = None
+        self._summary_turns = 0
+
+    @property
+    def children(self) -> List[Block]:
+        """The blocks into which this block is subdivided, in their current
+        order and placed at the positions determined by this Block's position.
+        """
+        if self._stale:
+            self._place_children()
+        return self._children
 
-    def __str__(self) -> str:
-        """Return this Block in a string format.
+    @children.setter
+    def children(self, children: List[Block]) -> None:
+        """Set the children of this Block to <children>.
+
+        Any pending orientation is applied to the old children first, so that
+        they are exact if they are kept and reattached later.
         """
-        if len(self.children) == 0:
-            indents = '\t' * self.level
-            colour = colour_name(self.colour)
-            return f'{indents}Leaf: colour={colour}, pos={self.position}, ' \
-                   f'size={self.size}, level={self.level}\n'
-        else:
-            indents = '\t' * self.level
-            result = f'{indents}Parent: pos={self.position},' \
-                     f'size={self.size}, level={self.level}\n'
+        self.refresh()
+        self._children = children
+        for child in children:
+            child._parent = self
+        self._invalidate()
+        self._stale = True
+        self._orientation = 0
+        self._turns = 0
+
+    @property
+    def colour(self) -> Optional[int]:
+        """If this block is not subdivided, the colour of this block.
+        Otherwise, None.
+        """
+        return self._colour
+
+    @colour.setter
+    def colour(self, colour: Optional[int]) -> None:
+        """Set the colour of this Block to <colour>.
+        """
+        self._colour = colour
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        """Clear the cached structural hashes and blob summaries of this Block
+        and its ancestors.
+        """
+        block = self
+        while block is not None and (block._hashes is not None or
+                                     block._summaries is not None):
+            block._hashes = None
+            block._summaries = None
+            block._summary_turns = 0
+            block = block._parent
+
+    def _hash_vector(self) -> Tuple[int, int, int, int]:
+        """Return the structural hashes of this Block after 0, 1, 2 and 3
+        clockwise quarter turns, computing any that are not cached.
+
+        The missing hashes are computed in post-order with an explicit stack,
+        so boards deeper than the recursion limit can be hashed.
+        """
+        stack = [self]
+        while stack:
+            block = stack[-1]
+            if block._hashes is not None:
+                stack.pop()
+                continue
+            children = block.children
+            if not children:
+                value = _leaf_hash(block.level, block._colour)
+                block._hashes = (value, value, value, value)
+                stack.pop()
+                continue
+            missing = [child for child in children if child._hashes is None]
+            if missing:
+                stack.extend(missing)
+                continue
+            vectors = [child._hashes for child in children]
+            hashes = []
+            for turns in range(4):
+                hashes.append(_parent_hash(
+                    block.level, [vectors[(i + turns) % 4][turns]
+                                  for i in range(4)]))
+            block._hashes = tuple(hashes)
+            stack.pop()
+        return self._hashes
+
+    def _cached_summary(self, colour: int) -> Optional[BlobSummary]:
+        """Return the cached BlobSummary of <colour> in this Block, or None
+        if it is not cached, turning the cached summaries first if this Block
+        was rotated since they were merged.
+        """
+        if self._summary_turns:
+            self._summaries = {key: turn_summary(value, self._summary_turns)
+                               for key, value in self._summaries.items()}
+            self._summary_turns = 0
+        if self._summaries is None:
+            self._summaries = {}
+        return self._summaries.get(colour)
+
+    def blob_summary(self, colour: int) -> BlobSummary:
+        """Return the BlobSummary of the blobs of <colour> in this Block.
+
+        Summaries are cached, so after a move only the summaries along the
+        path from the moved Block to the root are merged again. They are
+        merged in post-order with an explicit stack, so boards deeper than the
+        recursion limit can be summarized.
+        """
+        stack = [self]
+        while stack:
+            block = stack[-1]
+            if block._cached_summary(colour) is not None:
+                stack.pop()
+                continue
+            children = block.children
+            if not children:
+                block._summaries[colour] = leaf_summary(
+                    2 ** (block.max_depth - block.level),
+                    block._colour == colour)
+                stack.pop()
+                continue
+            missing = [child for child in children
+                       if child._cached_summary(colour) is None]
+            if missing:
+                stack.extend(missing)
+                continue
+            block._summaries[colour] = merge_summaries(
+                [child._summaries[colour] for child in children])
+            stack.pop()
+        return self._summaries[colour]
+
+    def structure_hash(self) -> int:
+        """Return the 64-bit structural hash of this Block.
+
+        This takes constant time unless this Block or one of its descendants
+        moved since the last call, in which case only the hashes along the
+        paths to the moved Blocks are computed again.
+        """
+        return self._hash_vector()[0]
 
-            for child in self.children:
-                result += str(child)
+    def __hash__(self) -> int:
+        """Return a hash of this Block that is equal for equivalent Blocks.
+        """
+        return self.structure_hash()
 
-            return result
+    def __str__(self) -> str:
+        """Return this Block in a string format.
+        """
+        lines = []
+        for block in preorder(self):
+            indents = '\t' * block.level
+            if len(block.children) == 0:
+                colour = colour_name(block.colour)
+                lines.append(f'{indents}Leaf: colour={colour}, '
+                             f'pos={block.position}, size={block.size}, '
+                             f'level={block.level}\n')
+            else:
+                lines.append(f'{indents}Parent: pos={block.position},'
+                             f'size={block.size}, level={block.level}\n')
+        return ''.join(lines)
 
     def __eq__(self, other: Block) -> bool:
         """Return True iff this Block and all its descendents are equivalent to
         the <other> Block and all its descendents.
         """
-        if len(self.children) == 0 and len(other.children) == 0:
-            # Both self and other are leaves.
-            return self.position == other.position and \
-                   self.size == other.size and \
-                   self.colour == other.colour and \
-                   self.level == other.level and \
-                   self.max_depth == other.max_depth
-
-        elif len(self.children) != len(other.children):
-            # One of self or other is a leaf while the other is not.
-            return False
-        else:
-            # Both self and other have four children.
-            for i in range(4):
-                # The != operator also uses the __eq__ special method.
-                if self.children[i] != other.children[i]:
+        for mine, theirs in preorder_pairs(self, other):
+            if mine._hashes is not None and theirs._hashes is not None \
+                    and mine._hashes[0] != theirs._hashes[0]:
+                # Equivalent Blocks always have the same structural hash.
+                return False
+            if len(mine.children) == 0 and len(theirs.children) == 0:
+                # Both are leaves.
+                if mine.position != theirs.position or \
+                        mine.size != theirs.size or \
+                        mine.colour != theirs.colour or \
+                        mine.level != theirs.level or \
+                        mine.max_depth != theirs.max_depth:
                     return False
-
-            return True
+            elif len(mine.children) != len(theirs.children):
+                # One of them is a leaf while the other is not.
+                return False
+        return True
 
     def _child_size(self) -> int:
         """Return the size of this Block's children.
@@ -178,22 +479,137 @@ class Block:
         return [(x + size, y), (x, y), (x, y + size), (x + size, y + size)]
 
     def _update_children_positions(self, position: Tuple[int, int]) -> None:
-        """Set the position of this Block to <position> and update all its
-        descendants to have positions consistent with this Block's.
+        """Set the position of this Block to <position>.
 
-        <position> is the (x, y) coordinates of the upper-left corner of this
-        Block.
+        The descendants of this Block are placed lazily, the next time their
+        parent's children are accessed.
         """
+        if self.position != position:
+            self.position = position
+            self._stale = True
 
-        self.position = position
+    def _place_children(self) -> None:
+        """Apply the pending orientation of this Block to its children and move
+        them to the positions determined by this Block's position and their
+        index in <_children>.
+
+        Only the children are reordered and moved. A child that moved or was
+        turned updates its own children the next time they are accessed.
+
+        While this Block has fewer than four children, it stays stale so that
+        children appended to <children> are placed once there are four.
+        """
+        if len(self._children) != 4:
+            return
+        self._stale = False
+        if self._orientation:
+            old = self._children
+            order = _ORDERS[self._orientation]
+            self._children = [old[order[0]], old[order[1]], old[order[2]],
+                              old[order[3]]]
+            self._orientation = 0
+        if self._turns:
+            for child in self._children:
+                child._turn(self._turns)
+            self._turns = 0
         positions = self._children_positions()
-        if len(self.children) == 4:
-            self.children[0].position = (positions[0])
-            self.children[1].position = (positions[1])
-            self.children[2].position = (positions[2])
-            self.children[3].position = (positions[3])
-            for child in self.children:
-                child._update_children_positions(child.position)
+        for i in range(4):
+            self._children[i]._parent = self
+            self._children[i]._update_children_positions(positions[i])
+
+    def refresh(self) -> None:
+        """Apply the moves recorded lazily on the ancestors of this Block and
+        on this Block itself, from the root down, so that the children of this
+        Block are exact.
+
+        This is only needed for a Block that was kept while other moves were
+        made: any later move on this Block then happens after those moves.
+        """
+        ancestors = []
+        block = self
+        while block is not None:
+            ancestors.append(block)
+            block = block._parent
+        for block in reversed(ancestors):
+            if block._stale:
+                block._place_children()
+
+    def subscribe(self, observer: Callable[[BlockChange], None]) -> None:
+        """Call <observer> with a BlockChange after every move that changes
+        this Block or one of its descendants.
+        """
+        if self._observers is None:
+            self._observers = []
+        self._observers.append(observer)
+
+    def unsubscribe(self, observer: Callable[[BlockChange], None]) -> None:
+        """Stop calling <observer> after moves on this Block.
+
+        Precondition: <observer> was subscribed to this Block.
+        """
+        self._observers.remove(observer)
+        if not self._observers:
+            self._observers = None
+
+    def _notify(self, action: str, direction: Optional[int]) -> None:
+        """Send a BlockChange for the move <action> in <direction> on this
+        Block to the observers of this Block and of its ancestors.
+
+        The unit cells of this Block are found by walking up to the root, which
+        only happens when there is an observer to send the change to.
+        """
+        observers = []
+        block = self
+        while block is not None:
+            if block._observers is not None:
+                observers.extend(block._observers)
+            block = block._parent
+        if not observers:
+            return
+        self.refresh()
+        column = 0
+        row = 0
+        cells = 2 ** (self.max_depth - self.level)
+        span = cells
+        block = self
+        while block._parent is not None:
+            index = block._index_in_parent()
+            if index in (0, 3):
+                column += span
+            if index in (2, 3):
+                row += span
+            span *= 2
+            block = block._parent
+        change = BlockChange(action, direction, self, column, row, cells)
+        for observer in observers:
+            observer(change)
+
+    def _index_in_parent(self) -> int:
+        """Return the index of this Block among the children of its parent.
+
+        Precondition: this Block has a parent, which is not stale.
+        """
+        # Compare by identity, since == compares whole subtrees.
+        siblings = self._parent._children
+        index = 0
+        while siblings[index] is not self:
+            index += 1
+        return index
+
+    def path(self) -> List[int]:
+        """Return the indices of the children to follow from the root of the
+        tree that this Block is in down to this Block.
+
+        The path of the root is [].
+        """
+        self.refresh()
+        path = []
+        block = self
+        while block._parent is not None:
+            path.append(block._index_in_parent())
+            block = block._parent
+        path.reverse()
+        return path
 
     def smashable(self) -> bool:
         """Return True iff this block can be smashed.
@@ -212,6 +628,15 @@ class Block:
 
         Return True iff the smash was performed.
         """
+        if self._smash():
+            self._notify('smash', None)
+            return True
+        return False
+
+    def _smash(self) -> bool:
+        """Sub-divide this block as described in smash, without notifying the
+        observers.
+        """
         colours = []
         for _ in range(4):
             colours.append(COLOUR_LIST[random.randint(0, len(COLOUR_LIST)-1)])
@@ -252,7 +677,7 @@ class Block:
             for i in range(4):
                 if subdivide[i] < math.exp(-0.25 * (self.level + 1)):
                     self.children[i].colour = None
-                    self.children[i].smash()
+                    self.children[i]._smash()
             return True
 
     def swap(self, direction: int) -> bool:
@@ -265,44 +690,21 @@ class Block:
 
         Precondition: <direction> is either 0 or 1
         """
-        if not self.children:
+        if not self._children or direction not in _SWAP_ORIENTATION:
             return False
-        if direction == 0:
-            old_upper_left = self.children[1]
-            old_upper_left_position = self.children[1].position
-            old_upper_right = self.children[0]
-            self.children[0], self.children[1] = old_upper_left, old_upper_right
-            self.children[0]._update_children_positions(
-                old_upper_right.position)
-            self.children[1]._update_children_positions(old_upper_left_position)
-            old_lower_left = self.children[2]
-            old_lower_right = self.children[3]
-            lower_position = self.children[3].position
-            self.children[2], self.children[3] = old_lower_right, old_lower_left
-            self.children[2]._update_children_positions(old_lower_left.position)
-            self.children[3]._update_children_positions(lower_position)
-            return True
-        elif direction == 1:
-            old_upper_left = self.children[1]
-            old_upper_right = self.children[0]
-            upper_position = self.children[1].position
-            old_lower_left = self.children[2]
-            old_lower_right = self.children[3]
-            lower_position = self.children[3].position
-            self.children[1], self.children[2] = old_lower_left, old_upper_left
-            self.children[2]._update_children_positions(old_lower_left.position)
-            self.children[1]._update_children_positions(upper_position)
-            self.children[0], self.children[3] = old_lower_right, \
-                old_upper_right
-            self.children[0]._update_children_positions(
-                old_upper_right.position)
-            self.children[3]._update_children_positions(lower_position)
-            return True
-        return False
+        self.refresh()
+        self._orientation = _COMPOSE[self._orientation][
+            _SWAP_ORIENTATION[direction]]
+        self._stale = True
+        self._invalidate()
+        self._notify('swap', direction)
+        return True
 
     def rotate(self, direction: int) -> bool:
         """Rotate this Block and all its descendants.
 
+        This takes constant time; the descendants are rotated lazily.
+
         If this Block has no children, do nothing. If <direction> is 1, rotate
         clockwise. If <direction> is 3, rotate counter-clockwise.
 
@@ -310,49 +712,34 @@ class Block:
 
         Precondition: <direction> is either 1 or 3.
         """
-        if not self.children:
+        if not self._children:
             return False
-        if direction == 1:
-            old_upper_left = self.children[1]
-            upper_left_position = self.children[1].position
-            old_upper_right = self.children[0]
-            upper_right_position = self.children[0].position
-            old_lower_left = self.children[2]
-            lower_left_position = self.children[2].position
-            old_lower_right = self.children[3]
-            lower_right_position = self.children[3].position
-            self.children[0], self.children[1], self.children[2], \
-                self.children[3] = old_upper_left, old_lower_left, \
-                old_lower_right, old_upper_right
-            self.children[0]._update_children_positions(upper_right_position)
-            self.children[1]._update_children_positions(upper_left_position)
-            self.children[2]._update_children_positions(lower_left_position)
-            self.children[3]._update_children_positions(lower_right_position)
-
-            for child in self.children:
-                child.rotate(direction)
-            return True
-        else:
-            old_upper_left = self.children[1]
-            upper_left_position = self.children[1].position
-            old_upper_right = self.children[0]
-            upper_right_position = self.children[0].position
-            old_lower_left = self.children[2]
-            lower_left_position = self.children[2].position
-            old_lower_right = self.children[3]
-            lower_right_position = self.children[3].position
-            self.children[0], self.children[1], self.children[2], \
-                self.children[3] = old_lower_right, old_upper_right, \
-                old_upper_left, old_lower_left
-            self.children[0]._update_children_positions(upper_right_position)
-            self.children[1]._update_children_positions(upper_left_position)
-            self.children[2]._update_children_positions(lower_left_position)
-            self.children[3]._update_children_positions(lower_right_position)
-            for child in self.children:
-                child.rotate(direction)
-            return True
+        self.refresh()
+        self._turn(direction)
+        if self._parent is not None:
+            self._parent._invalidate()
+        self._notify('rotate', direction)
+        return True
 
-    def paint(self, colour: Tuple[int, int, int]) -> bool:
+    def _turn(self, turns: int) -> None:
+        """Record that this Block and all its descendants are rotated <turns>
+        quarter turns clockwise.
+
+        The rotation is applied to the children the next time they are
+        accessed.
+        """
+        if self._children:
+            self._orientation = _COMPOSE[self._orientation][turns]
+            self._turns = (self._turns + turns) % 4
+            self._stale = True
+            if self._summaries is not None:
+                self._summary_turns = (self._summary_turns + turns) % 4
+            if self._hashes is not None:
+                old = self._hashes
+                self._hashes = (old[turns % 4], old[(turns + 1) % 4],
+                                old[(turns + 2) % 4], old[(turns + 3) % 4])
+
+    def paint(self, colour: int) -> bool:
         """Change this Block's colour iff it is a leaf at a level of max_depth
         and its colour is different from <colour>.
 
@@ -361,6 +748,7 @@ class Block:
         if not self.children and self.level == self.max_depth \
                 and self.colour != colour:
             self.colour = colour
+            self._notify('paint', None)
             return True
         return False
 
@@ -377,37 +765,53 @@ class Block:
 
         Return True iff this Block was turned into a leaf node.
         """
-        if not self.children:
+        if self._combine():
+            self._notify('combine', None)
+            return True
+        return False
+
+    def _combine(self) -> bool:
+        """Turn this Block into a leaf as described in combine, without
+        notifying the observers.
+        """
+        colour = self.majority_colour()
+        if colour is None:
             return False
+        self.children = []
+        self.colour = colour
+        return True
+
+    def majority_colour(self) -> Optional[int]:
+        """Return the colour that combine would give this Block, or None if
+        combine would do nothing.
+
+        This Block is not changed.
+        """
+        if not self.children:
+            return None
         if self.level != self.max_depth - 1:
-            return False
-        colour_list = {}
-        for item in COLOUR_LIST:
-            colour_list[item] = 0
+            return None
+        colour_list = [0] * len(COLOUR_LIST)
         for child in self.children:
             colour_list[child.colour] += 1
         maxed = 0
-        colour = ()
-        for key in colour_list:
+        colour = None
+        for key in COLOUR_LIST:
             if colour_list[key] > maxed:
                 maxed = colour_list[key]
                 colour = key
         if maxed <= 1:
-            return False
+            return None
         if maxed >= 3:
-            self.colour = colour
-            self.children = []
-            return True
+            return colour
         counter = 0
-        for key in colour_list:
+        for key in COLOUR_LIST:
             if colour_list[key] == 2 and counter == 0:
                 counter += 1
                 colour = key
             elif colour_list[key] == 2 and counter == 1:
-                return False
-        self.children = []
-        self.colour = colour
-        return True
+                return None
+        return colour
 
     def create_copy(self) -> Block:
         """Return a new Block that is a deep copy of this Block.
@@ -416,11 +820,22 @@ class Block:
         """
         new_block = Block(self.position, self.size, self.colour, self.level,
                           self.max_depth)
-        if not self.children:
-            return new_block
-        for child in self.children:
-            new_child = child.create_copy()
-            new_block.children.append(new_child)
+        stack = [(self, new_block)]
+        while stack:
+            block, copy = stack.pop()
+            if block.children:
+                new_children = []
+                for child in block.children:
+                    new_child = Block(child.position, child.size, child.colour,
+                                      child.level, child.max_depth)
+                    new_children.append(new_child)
+                    stack.append((child, new_child))
+                copy.children = new_children
+            # The copy has the same structure, so it has the same hashes.
+            copy._hashes = block._hashes
+            if block._summaries is not None:
+                copy._summaries = dict(block._summaries)
+                copy._summary_turns = block._summary_turns
         return new_block
 
 
@@ -430,7 +845,7 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
-            'settings'
+            'settings', 'traversal', 'blob'
         ],
         'max-attributes': 15,
         'max-args': 6
@@ -29,13 +29,15 @@ import pygame
 from actions import ACTION_MESSAGE, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
     SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
 from block import Block
+from cache import ScoreCache
+from goal import PerimeterGoal, PerimeterTracker
 from player import Player
 from renderer import Renderer
 from settings import ANIMATION_DURATION
+from traversal import leaves
 
 
-def _block_to_squares(board: Block) -> List[Tuple[Tuple[int, int, int],
-                                                  Tuple[int, int], int]]:
+def _block_to_squares(board: Block) -> List[Tuple[int, Tuple[int, int], int]]:
     """Return a list of tuples describing all of the squares to be drawn
     in order to render this Block.
 
@@ -48,16 +50,7 @@ def _block_to_squares(board: Block) -> List[Tuple[Tuple[int, int, int],
 
     The order of the squares does not matter.
     """
-    if not board.children:
-        colour = board.colour
-        position = board.position
-        size = board.size
-        return [(colour, position, size)]
-    else:
-        lst = []
-        for child in board.children:
-            lst.extend(_block_to_squares(child))
-        return lst
+    return [(leaf.colour, leaf.position, leaf.size) for leaf in leaves(board)]
 
 
 class GameData:
@@ -81,12 +74,20 @@ class GameData:
     === Representation Invariants ===
     - len(players) >= 1
     """
+    # === Private Attributes ===
+    # _perimeter:
+    #   The perimeter scores of <board>, kept up to date after every move, or
+    #   None if no player has a PerimeterGoal.
+    # _cache:
+    #   The goal scores of the boards scored so far.
     max_turns: int
     board: Block
     players: List[Player]
     smashes: Dict[int, int]
     combines: Dict[int, int]
     paints: Dict[int, int]
+    _perimeter: Optional[PerimeterTracker]
+    _cache: ScoreCache
 
     def __init__(self, board: Block, players: List[Player]) -> None:
         """Initialize the game data, saving a reference to <board> and
@@ -109,18 +110,44 @@ class GameData:
             self.combines[player.id] = 0
             self.paints[player.id] = 0
 
+        self._perimeter = None
+        if any(isinstance(player.goal, PerimeterGoal) for player in players):
+            self._perimeter = PerimeterTracker(board)
+        self._cache = ScoreCache()
+
     def calculate_score(self, player_id: int) -> Tuple[int, int]:
         """Return a tuple containing first the <player_id>'s score based on
         their goal in the game and second the deductions from their score based
         on the actions they've taken.
         """
-        goal_score = self.players[player_id].goal.score(self.board)
+        goal = self.players[player_id].goal
+        if self._perimeter is not None and isinstance(goal, PerimeterGoal):
+            goal_score = self._perimeter.score(goal.colour)
+        else:
+            goal_score = self._cache.score(self.board, goal)
 
-        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
-                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
-                  self.paints[player_id] * ACTION_PENALTY[PAINT]
+        return goal_score, self._penalty(player_id)
 
-        return goal_score, penalty
+    def calculate_scores(self) -> Dict[int, Tuple[int, int]]:
+        """Return a dictionary mapping the id of every player to the same
+        tuple as calculate_score.
+
+        All the goals are scored together with score_goals, so the edge of
+        the board is walked once for all the players rather than once each,
+        and not at all if the scores of the board are cached.
+        """
+        goal_scores = self._cache.score_all(
+            self.board, [player.goal for player in self.players])
+        return {player.id: (goal_score, self._penalty(player.id))
+                for player, goal_score in zip(self.players, goal_scores)}
+
+    def _penalty(self, player_id: int) -> int:
+        """Return the deductions from the score of <player_id> based on the
+        actions they've taken.
+        """
+        return self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
+            self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
+            self.paints[player_id] * ACTION_PENALTY[PAINT]
 
 
 class GameState:
@@ -285,12 +312,11 @@ class AnimateMoveState(GameState):
     _player_id: int
     _move: Tuple[str, Optional[int], Block]
     _start_time: int
-    _background: List[Tuple[Tuple[int, int, int], Tuple[int, int], int]]
+    _background: List[Tuple[int, Tuple[int, int], int]]
 
     def __init__(self, parent: GameState, player_id: int,
                  move: Tuple[str, Optional[int], Block],
-                 background: List[Tuple[Tuple[int, int, int], Tuple[int, int],
-                                        int]]) -> None:
+                 background: List[Tuple[int, Tuple[int, int], int]]) -> None:
         """Initialize this GameState.
         """
         self._parent = parent
@@ -350,8 +376,9 @@ class GameOverState(GameState):
         """Initialize this GameState.
         """
         self._scores = []
+        scores = data.calculate_scores()
         for p in data.players:
-            goal_score, penalty = data.calculate_score(p.id)
+            goal_score, penalty = scores[p.id]
             self._scores.append((p.id, goal_score, penalty))
 
         self._winner = max(self._scores, key=lambda item: item[1] - item[2])[0]
@@ -391,7 +418,8 @@ if __name__ == '__main__':
         'allowed-io': ['run_game'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'pygame', '__future__',
-            'block', 'player', 'renderer', 'settings', 'actions'
+            'block', 'player', 'renderer', 'settings', 'actions', 'traversal',
+            'goal', 'cache'
         ],
         'generated-members': 'pygame.*'
     })
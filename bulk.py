@@ -0,0 +1,163 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions to generate many random boards at once with
+NumPy.
+
+Boards are generated one level at a time for the whole batch, so each level
+takes a few batched random draws instead of one call to the random module for
+every colour and every subdivision.
+"""
+from __future__ import annotations
+from typing import Iterator, List, Optional
+import math
+
+import numpy as np
+
+from block import Block
+from compact import CompactBoard, NO_COLOUR
+from settings import BOARD_SIZE, COLOUR_LIST
+
+
+class BoardBatch:
+    """A batch of random boards stored level by level in NumPy arrays.
+
+    At each level, the blocks of all the boards are stored one board after
+    the other. Within a board, the children of the k-th parent at level l are
+    blocks 4k to 4k + 3 of that board at level l + 1, in the usual order of
+    upper-right, upper-left, lower-left and lower-right.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in every board.
+    parents:
+        parents[l] is a boolean array that is True for every block at level l
+        that has children.
+    colours:
+        colours[l] is a uint8 array with the palette index of the colour of
+        every block at level l, or NO_COLOUR for a parent.
+    offsets:
+        offsets[l][i] is the index in parents[l] and colours[l] of the first
+        block of board i at level l. offsets[l][len(self)] is the number of
+        blocks at level l.
+    """
+    max_depth: int
+    parents: List[np.ndarray]
+    colours: List[np.ndarray]
+    offsets: List[np.ndarray]
+
+    def __init__(self, max_depth: int, parents: List[np.ndarray],
+                 colours: List[np.ndarray], offsets: List[np.ndarray]) \
+            -> None:
+        """Initialize this batch with the given level-order arrays.
+        """
+        self.max_depth = max_depth
+        self.parents = parents
+        self.colours = colours
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        """Return the number of boards in this batch.
+        """
+        return len(self.offsets[0]) - 1
+
+    def to_compact(self, index: int) -> CompactBoard:
+        """Return board <index> of this batch as a CompactBoard.
+        """
+        parents = []
+        colours = []
+        for level in range(len(self.parents)):
+            start = self.offsets[level][index]
+            end = self.offsets[level][index + 1]
+            if start == end:
+                break
+            parents.append(self.parents[level][start:end].tolist())
+            colours.append(self.colours[level][start:end].tolist())
+        return CompactBoard.from_levels(self.max_depth, parents, colours)
+
+    def to_block(self, index: int, size: int = BOARD_SIZE) -> Block:
+        """Return board <index> of this batch as a Block with dimensions of
+        <size> by <size>.
+        """
+        return self.to_compact(index).to_block((0, 0), size)
+
+    def blocks(self, size: int = BOARD_SIZE) -> Iterator[Block]:
+        """Yield every board of this batch as a Block with dimensions of
+        <size> by <size>.
+        """
+        for index in range(len(self)):
+            yield self.to_block(index, size)
+
+
+def generate_boards(count: int, max_depth: int,
+                    seed: Optional[int] = None) -> BoardBatch:
+    """Return a batch of <count> new random boards with a depth of
+    <max_depth>.
+
+    The boards follow the same distribution as block.generate_board: the root
+    is always subdivided, a block at level l > 0 is subdivided with
+    probability exp(-0.25 * l) if l < max_depth, and every leaf has a colour
+    chosen uniformly from COLOUR_LIST. <seed> seeds the NumPy random number
+    generator used for the whole batch.
+
+    >>> batch = generate_boards(10, 3, seed=148)
+    >>> len(batch)
+    10
+    >>> len(batch.to_block(0).children) == 4
+    True
+    """
+    rng = np.random.default_rng(seed)
+    board_ids = np.arange(count)
+    parents = []
+    colours = []
+    offsets = []
+    for level in range(max_depth + 1):
+        size = len(board_ids)
+        if level == 0:
+            is_parent = np.full(size, max_depth > 0)
+        elif level < max_depth:
+            is_parent = rng.random(size) < math.exp(-0.25 * level)
+        else:
+            is_parent = np.zeros(size, dtype=bool)
+        level_colours = rng.integers(0, len(COLOUR_LIST), size, dtype=np.uint8)
+        level_colours[is_parent] = NO_COLOUR
+
+        parents.append(is_parent)
+        colours.append(level_colours)
+        offsets.append(np.concatenate(
+            ([0], np.cumsum(np.bincount(board_ids, minlength=count)))))
+
+        board_ids = np.repeat(board_ids[is_parent], 4)
+        if len(board_ids) == 0:
+            break
+    return BoardBatch(max_depth, parents, colours, offsets)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'math', 'numpy',
+            'block', 'compact', 'settings'
+        ],
+        'max-attributes': 15
+    })
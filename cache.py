@@ -0,0 +1,187 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains bounded least-recently-used caches of flattened boards and
+goal scores.
+
+Entries are keyed on the structural hash of a board and its number of unit
+cells per side, not on the Block object. Every move through the Block API
+changes the structural hash of the board, so a board that was moved never
+finds the entries of its old contents, and a board that is moved back, or an
+equivalent copy of it, finds them again. Looking up an unchanged board costs
+one dictionary lookup, since its structural hash is cached on the Block.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+from block import Block
+from goal import Goal, _flatten, score_goals
+from settings import COLOUR_LIST
+
+
+class LRUCache:
+    """A dictionary of at most <maxsize> entries that forgets the entry used
+    least recently when it is full.
+
+    === Public Attributes ===
+    maxsize:
+        The largest number of entries kept.
+    hits:
+        The number of lookups that found their key.
+    misses:
+        The number of lookups that did not find their key.
+
+    === Representation Invariants ===
+    - maxsize >= 1
+    """
+    # === Private Attributes ===
+    # _entries:
+    #   The entries, from the least to the most recently used.
+    maxsize: int
+    hits: int
+    misses: int
+    _entries: OrderedDict
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize an empty cache of at most <maxsize> entries.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of entries in this cache.
+        """
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value stored for <key>, or None if there is none, and
+        count the lookup as a hit or a miss.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store <value> for <key>, forgetting the least recently used entry
+        if this cache is full.
+
+        Precondition: value is not None
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def board_key(board: Block) -> Tuple[int, int]:
+    """Return the key of the current contents of <board> in a cache.
+    """
+    return board.structure_hash(), board.max_depth - board.level
+
+
+class ScoreCache:
+    """Caches of the flattened grids and goal scores of boards.
+
+    === Public Attributes ===
+    grids:
+        The flattened boards, keyed by board_key.
+    scores:
+        The goal scores, keyed by the goal type, the goal colour and
+        board_key.
+    """
+    grids: LRUCache
+    scores: LRUCache
+
+    def __init__(self, maxsize: int = 256) -> None:
+        """Initialize empty caches of at most <maxsize> grids and at most
+        <maxsize> scores for each colour in COLOUR_LIST.
+        """
+        self.grids = LRUCache(maxsize)
+        self.scores = LRUCache(len(COLOUR_LIST) * maxsize)
+
+    def flatten(self, board: Block) -> List[List[int]]:
+        """Return goal._flatten(<board>), flattening it only if it is not
+        cached.
+
+        The grid may be shared with other callers, so it must not be mutated.
+        """
+        key = board_key(board)
+        grid = self.grids.get(key)
+        if grid is None:
+            grid = _flatten(board)
+            self.grids.put(key, grid)
+        return grid
+
+    def score(self, board: Block, goal: Goal) -> int:
+        """Return <goal>.score(<board>), scoring it only if it is not cached.
+        """
+        key = (type(goal), goal.colour, board_key(board))
+        value = self.scores.get(key)
+        if value is None:
+            value = goal.score(board)
+            self.scores.put(key, value)
+        return value
+
+    def score_all(self, board: Block, goals: List[Goal]) -> List[int]:
+        """Return the score of each goal in <goals> on <board>, in order.
+
+        The goals that are not cached are scored together with score_goals.
+        """
+        key = board_key(board)
+        scores = []
+        missing = []
+        for goal in goals:
+            value = self.scores.get((type(goal), goal.colour, key))
+            scores.append(value)
+            if value is None:
+                missing.append(goal)
+        if missing:
+            found = iter(score_goals(board, missing))
+            for i, goal in enumerate(goals):
+                if scores[i] is None:
+                    scores[i] = next(found)
+                    self.scores.put((type(goal), goal.colour, key), scores[i])
+        return scores
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'collections',
+            'block', 'goal', 'settings'
+        ]
+    })
@@ -0,0 +1,373 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the CompactBoard class, an array-backed alternative to the
+pointer-based Block tree.
+
+A CompactBoard stores the whole quadtree in flat typed arrays instead of one
+Python object per block, which makes boards much smaller in memory and makes
+copying a board a handful of array copies.
+"""
+from __future__ import annotations
+from array import array
+from typing import List, Optional, Sequence, Tuple
+import random
+import math
+
+from block import Block
+from settings import COLOUR_LIST
+
+# The colour index stored for a block that has children.
+NO_COLOUR = 255
+
+# The order of the children after each rotate and swap, indexed by direction.
+# The child at index i after the move is the child at index PERM[i] before it.
+_ROTATE_ORDER = {1: (1, 2, 3, 0), 3: (3, 0, 1, 2)}
+_SWAP_ORDER = {0: (1, 0, 3, 2), 1: (3, 2, 1, 0)}
+
+
+class CompactBoard:
+    """A Blocky board stored as a linear quadtree.
+
+    Every block of the board is a node, identified by its integer index. The
+    root of the board is always node 0. Children are stored in the same order
+    as in Block: upper-right child, upper-left child, lower-left child,
+    lower-right child.
+
+    Colours are stored as palette indices in one byte each, as in Block.
+
+    === Public Attributes ===
+    max_depth:
+        The deepest level allowed in the board.
+
+    === Representation Invariants ===
+    - A node is either a leaf, with all four of its child slots set to -1 and
+      a colour index other than NO_COLOUR, or a parent, with four valid child
+      indices and a colour of NO_COLOUR.
+    - The level of a child is one greater than the level of its parent.
+    - Every level is <= max_depth.
+    """
+    # === Private Attributes ===
+    # _children:
+    #   The child indices of every node. The children of node n are stored in
+    #   _children[4 * n] to _children[4 * n + 3].
+    # _colours:
+    #   The colour index of every node, or NO_COLOUR for a parent.
+    # _levels:
+    #   The level of every node.
+    # _free:
+    #   Indices of nodes discarded by combine that can be reused by smash.
+    max_depth: int
+    _children: array
+    _colours: array
+    _levels: array
+    _free: List[int]
+
+    def __init__(self, colour: int, max_depth: int) -> None:
+        """Initialize this board as a single leaf of colour index <colour>
+        and with the given <max_depth>.
+
+        Precondition:
+            - 0 <= colour < len(COLOUR_LIST)
+            - max_depth >= 0
+        """
+        self.max_depth = max_depth
+        self._children = array('i', [-1, -1, -1, -1])
+        self._colours = array('B', [colour])
+        self._levels = array('B', [0])
+        self._free = []
+
+    def __eq__(self, other: CompactBoard) -> bool:
+        """Return True iff this board and <other> describe the same blocks.
+
+        Node indices do not need to match, only the shape of the trees and the
+        colours of their leaves.
+        """
+        if self.max_depth != other.max_depth:
+            return False
+        stack = [(0, 0)]
+        while stack:
+            mine, theirs = stack.pop()
+            if self._colours[mine] != other._colours[theirs]:
+                return False
+            if self._colours[mine] == NO_COLOUR:
+                for i in range(4):
+                    stack.append((self._children[4 * mine + i],
+                                  other._children[4 * theirs + i]))
+        return True
+
+    def __len__(self) -> int:
+        """Return the number of blocks currently on this board.
+        """
+        return len(self._colours) - len(self._free)
+
+    def is_leaf(self, node: int) -> bool:
+        """Return True iff <node> has no children.
+        """
+        return self._children[4 * node] == -1
+
+    def child(self, node: int, index: int) -> int:
+        """Return the child of <node> at <index>, or -1 if <node> is a leaf.
+        """
+        return self._children[4 * node + index]
+
+    def colour(self, node: int) -> Optional[int]:
+        """Return the colour index of <node>, or None if it has children.
+        """
+        colour = self._colours[node]
+        if colour == NO_COLOUR:
+            return None
+        return colour
+
+    def level(self, node: int) -> int:
+        """Return the level of <node>.
+        """
+        return self._levels[node]
+
+    def find(self, path: List[int]) -> int:
+        """Return the node reached from the root by following the child
+        indices in <path>.
+
+        Precondition: every node along <path> except the last has children.
+        """
+        node = 0
+        for index in path:
+            node = self._children[4 * node + index]
+        return node
+
+    def _new_node(self, colour: int, level: int) -> int:
+        """Return the index of a new leaf node with <colour> at <level>,
+        reusing a discarded node if there is one.
+        """
+        if self._free:
+            node = self._free.pop()
+            self._colours[node] = colour
+            self._levels[node] = level
+            return node
+        self._children.extend((-1, -1, -1, -1))
+        self._colours.append(colour)
+        self._levels.append(level)
+        return len(self._colours) - 1
+
+    def smashable(self, node: int) -> bool:
+        """Return True iff <node> can be smashed.
+        """
+        return self._levels[node] != self.max_depth and self.is_leaf(node)
+
+    def smash(self, node: int) -> bool:
+        """Sub-divide <node> so that it has four randomly generated children.
+
+        This follows the same rules, and draws from <random> in the same
+        order, as Block.smash.
+
+        Return True iff the smash was performed.
+        """
+        colours = []
+        for _ in range(4):
+            colours.append(random.randint(0, len(COLOUR_LIST) - 1))
+        level = self._levels[node]
+        if level == self.max_depth or not self.is_leaf(node):
+            return False
+        for i in range(4):
+            self._children[4 * node + i] = self._new_node(colours[i], level + 1)
+        self._colours[node] = NO_COLOUR
+        if level == self.max_depth - 1:
+            return True
+        subdivide = []
+        for _ in range(4):
+            subdivide.append(random.random())
+        for i in range(4):
+            if subdivide[i] < math.exp(-0.25 * (level + 1)):
+                self.smash(self._children[4 * node + i])
+        return True
+
+    def _reorder(self, node: int, order: Tuple[int, int, int, int]) -> None:
+        """Reorder the children of <node> so that the new child i is the old
+        child order[i].
+        """
+        base = 4 * node
+        old = self._children[base:base + 4]
+        for i in range(4):
+            self._children[base + i] = old[order[i]]
+
+    def swap(self, node: int, direction: int) -> bool:
+        """Swap the children of <node> horizontally if <direction> is 0 and
+        vertically if <direction> is 1.
+
+        Return True iff the swap was performed.
+        """
+        if self.is_leaf(node) or direction not in _SWAP_ORDER:
+            return False
+        self._reorder(node, _SWAP_ORDER[direction])
+        return True
+
+    def rotate(self, node: int, direction: int) -> bool:
+        """Rotate <node> and all its descendants clockwise if <direction> is
+        1 and counter-clockwise if <direction> is 3.
+
+        Return True iff the rotate was performed.
+        """
+        if self.is_leaf(node) or direction not in _ROTATE_ORDER:
+            return False
+        order = _ROTATE_ORDER[direction]
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not self.is_leaf(current):
+                self._reorder(current, order)
+                stack.extend(self._children[4 * current:4 * current + 4])
+        return True
+
+    def paint(self, node: int, colour: int) -> bool:
+        """Change the colour of <node> to the colour index <colour> iff it is
+        a leaf at max_depth and its colour is different from <colour>.
+
+        Return True iff the colour was changed.
+        """
+        if self.is_leaf(node) and self._levels[node] == self.max_depth \
+                and self._colours[node] != colour:
+            self._colours[node] = colour
+            return True
+        return False
+
+    def combine(self, node: int) -> bool:
+        """Turn <node> into a leaf based on the majority colour of its
+        children, following the same rules as Block.combine.
+
+        Return True iff <node> was turned into a leaf.
+        """
+        if self.is_leaf(node) or self._levels[node] != self.max_depth - 1:
+            return False
+        base = 4 * node
+        counts = [0] * len(COLOUR_LIST)
+        for i in range(4):
+            counts[self._colours[self._children[base + i]]] += 1
+        maxed = max(counts)
+        if maxed <= 1 or (maxed == 2 and counts.count(2) == 2):
+            return False
+        for i in range(4):
+            self._free.append(self._children[base + i])
+            self._children[base + i] = -1
+        self._colours[node] = counts.index(maxed)
+        return True
+
+    def create_copy(self) -> CompactBoard:
+        """Return a new CompactBoard that is a copy of this board.
+        """
+        new_board = CompactBoard.__new__(CompactBoard)
+        new_board.max_depth = self.max_depth
+        new_board._children = array('i', self._children)
+        new_board._colours = array('B', self._colours)
+        new_board._levels = array('B', self._levels)
+        new_board._free = self._free[:]
+        return new_board
+
+    def to_block(self, position: Tuple[int, int] = (0, 0),
+                 size: int = 750) -> Block:
+        """Return a Block tree equivalent to this board, with its upper left
+        corner at <position> and dimensions of <size> by <size>.
+        """
+        root = Block(position, size, None, 0, self.max_depth)
+        stack = [(root, 0)]
+        while stack:
+            block, node = stack.pop()
+            if self.is_leaf(node):
+                block.colour = self._colours[node]
+            else:
+                positions = block._children_positions()
+                child_size = block._child_size()
+                new_children = []
+                for i in range(4):
+                    child = Block(positions[i], child_size, None,
+                                  block.level + 1, block.max_depth)
+                    new_children.append(child)
+                    stack.append((child, self._children[4 * node + i]))
+                block.children = new_children
+        return root
+
+    @staticmethod
+    def from_block(block: Block) -> CompactBoard:
+        """Return a new CompactBoard equivalent to <block>.
+
+        <block> becomes the root of the new board, at level 0.
+        """
+        board = CompactBoard(0, block.max_depth - block.level)
+        stack = [(block, 0)]
+        while stack:
+            current, node = stack.pop()
+            if not current.children:
+                board._colours[node] = current.colour
+            else:
+                board._colours[node] = NO_COLOUR
+                for i in range(4):
+                    child = board._new_node(0, board._levels[node] + 1)
+                    board._children[4 * node + i] = child
+                    stack.append((current.children[i], child))
+        return board
+
+    @staticmethod
+    def from_levels(max_depth: int, parents: Sequence[Sequence[bool]],
+                    colours: Sequence[Sequence[int]]) -> CompactBoard:
+        """Return a new CompactBoard from a level-order description of its
+        blocks.
+
+        parents[l][j] and colours[l][j] describe the j-th block at level l:
+        whether it has children, and its colour index if it does not. The
+        children of the k-th parent at level l are blocks 4k to 4k + 3 at
+        level l + 1, in the usual order.
+        """
+        board = CompactBoard(0, max_depth)
+        nodes = [0]
+        for level in range(len(parents)):
+            next_nodes = []
+            for j in range(len(nodes)):
+                node = nodes[j]
+                if parents[level][j]:
+                    board._colours[node] = NO_COLOUR
+                    for i in range(4):
+                        child = board._new_node(0, level + 1)
+                        board._children[4 * node + i] = child
+                        next_nodes.append(child)
+                else:
+                    board._colours[node] = colours[level][j]
+            nodes = next_nodes
+        return board
+
+
+def generate_compact_board(max_depth: int) -> CompactBoard:
+    """Return a new random CompactBoard with a depth of <max_depth>, generated
+    the same way as block.generate_board.
+    """
+    board = CompactBoard(random.randint(0, len(COLOUR_LIST) - 1), max_depth)
+    board.smash(0)
+    return board
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
+            'array', 'block', 'settings'
+        ],
+        'max-attributes': 15
+    })
@@ -23,21 +23,35 @@ This file contains some sample tests for Assignment 2.
 Please use this as a starting point to check your work and write your own
 tests!
 """
-from typing import List, Optional, Tuple
+from typing import List, Optional
 import os
+import random
+import time
 import pygame
 import pytest
 
-from block import Block
+from blob import largest_blob, largest_blobs
+from block import Block, BlockChange, generate_board
 from blocky import _block_to_squares
-from goal import BlobGoal, PerimeterGoal, _flatten
-from player import _get_block
+from cache import LRUCache, ScoreCache
+from compact import CompactBoard, generate_compact_board
+from journal import MoveJournal, apply_move
+from moves import MOVE_ACTIONS, count_legal_moves, is_legal, \
+    legal_move_paths, legal_moves, sample_moves
+from persistent import PersistentBoard
+from serialize import CorpusReader, decode_board, encode_board, \
+    write_corpus
+from goal import BlobGoal, PerimeterGoal, PerimeterTracker, _flatten, \
+    _flatten_indices, score_goals
+from player import MCTSPlayer, SmartPlayer, _get_block
 from renderer import Renderer
-from settings import COLOUR_LIST
+from traversal import edge_leaf_cells, leaves, level_order, path_to_cell, \
+    preorder
+from settings import COLOUR_LIST, PALETTE, PALETTE_NAMES, colour_name, \
+    set_palette
 
 
-def set_children(block: Block, colours: List[Optional[Tuple[int, int, int]]]) \
-        -> None:
+def set_children(block: Block, colours: List[Optional[int]]) -> None:
     """Set the children at <level> for <block> using the given <colours>.
 
     Precondition:
@@ -125,7 +139,7 @@ def board_16x16_rotate1() -> Block:
 
 
 @pytest.fixture
-def flattened_board_16x16() -> List[List[Tuple[int, int, int]]]:
+def flattened_board_16x16() -> List[List[int]]:
     """Create a list of the unit cells inside the reference board."""
     return [
         [COLOUR_LIST[2], COLOUR_LIST[2], COLOUR_LIST[1], COLOUR_LIST[1]],
@@ -152,13 +166,13 @@ def test_block_to_squares_reference(board_16x16) -> None:
     # The order the squares appear may differ based on the implementation, so
     # we use a set here.
     squares = set(_block_to_squares(board_16x16))
-    expected = {((1, 128, 181), (563, 0), 188),
-                ((199, 44, 58), (375, 0), 188),
-                ((199, 44, 58), (375, 188), 188),
-                ((255, 211, 92), (563, 188), 188),
-                ((138, 151, 71), (0, 0), 375),
-                ((199, 44, 58), (0, 375), 375),
-                ((255, 211, 92), (375, 375), 375)
+    expected = {(COLOUR_LIST[0], (563, 0), 188),
+                (COLOUR_LIST[1], (375, 0), 188),
+                (COLOUR_LIST[1], (375, 188), 188),
+                (COLOUR_LIST[3], (563, 188), 188),
+                (COLOUR_LIST[2], (0, 0), 375),
+                (COLOUR_LIST[1], (0, 375), 375),
+                (COLOUR_LIST[3], (375, 375), 375)
                 }
 
     assert squares == expected
@@ -257,6 +271,355 @@ class TestBlock:
         board_16x16.children[0].rotate(1)
         assert board_16x16 == board_16x16_rotate1
 
+    def test_rotate_and_swap_compose(self, board_16x16,
+                                     board_16x16_swap0) -> None:
+        """Test that moves recorded on a block before its children are
+        accessed are applied in order.
+        """
+        board_16x16.rotate(1)
+        board_16x16.swap(1)
+        board_16x16.rotate(3)
+        assert board_16x16 == board_16x16_swap0
+
+
+class TestTraversal:
+    """A collection of methods that test the traversal generators.
+    """
+    def test_orders(self, board_16x16) -> None:
+        """Test the order in which the reference board is walked.
+        """
+        first = board_16x16.children[0]
+        assert list(preorder(board_16x16)) == \
+            [board_16x16, first] + first.children + board_16x16.children[1:]
+        assert list(level_order(board_16x16)) == \
+            [board_16x16] + board_16x16.children + first.children
+        assert len(list(leaves(board_16x16))) == 7
+
+    def test_edge_leaf_cells(self, board_16x16) -> None:
+        """Test that only the leaves on the edge of the reference board are
+        yielded.
+        """
+        interior = board_16x16.children[0].children[2]
+        edge = [leaf for leaf, _, _, _ in edge_leaf_cells(board_16x16)]
+        assert len(edge) == 6
+        assert interior not in edge
+
+    def test_deep_board(self) -> None:
+        """Test that a board deeper than the recursion limit can be copied,
+        compared, printed, hashed and scored.
+        """
+        depth = 1500
+        board = Block((0, 0), 750, None, 0, depth)
+        block = board
+        while block.level < depth:
+            colours = [None] + [COLOUR_LIST[0]] * 3
+            if block.level == depth - 1:
+                colours[0] = COLOUR_LIST[1]
+            set_children(block, colours)
+            block = block.children[0]
+
+        copy = board.create_copy()
+        assert copy == board
+        assert len(list(leaves(copy))) == 3 * depth + 1
+        assert str(copy).count('\n') == 4 * depth + 1
+        assert copy.structure_hash() == board.structure_hash()
+        assert BlobGoal(COLOUR_LIST[0]).score(board) == 4 ** depth - 1
+
+    def test_path_to_cell_at_depth_12(self) -> None:
+        """Test that unit cells are found exactly on a board whose deepest
+        blocks are smaller than a pixel.
+        """
+        depth = 12
+        board = Block((0, 0), 750, None, 0, depth)
+        block = board
+        while block.level < depth:
+            set_children(block, [COLOUR_LIST[0]] * 3 + [None])
+            block = block.children[3]
+        block.colour = COLOUR_LIST[1]
+
+        last = 2 ** depth - 1
+        assert list(path_to_cell(board, last, last, depth))[-1] is block
+        assert list(path_to_cell(board, last - 1, last, depth))[-1].level == \
+            depth
+        assert list(path_to_cell(board, last + 1, 0, depth)) == []
+        assert len(list(path_to_cell(board, 0, 0, depth))) == 2
+
+
+class TestBlockHash:
+    """A collection of methods that test the structural hash of Block.
+    """
+    def test_equal_boards_equal_hashes(self, board_16x16) -> None:
+        """Test that a copy of a board has the same hash and can be used to
+        look it up in a dict.
+        """
+        scores = {board_16x16: 5}
+        assert scores[board_16x16.create_copy()] == 5
+
+    def test_hash_follows_moves(self, board_16x16, board_16x16_swap0,
+                                board_16x16_rotate1) -> None:
+        """Test that the hash of a board is updated by moves made after it was
+        first computed.
+        """
+        before = hash(board_16x16)
+        board_16x16.swap(0)
+        assert hash(board_16x16) == hash(board_16x16_swap0)
+        board_16x16.swap(0)
+        assert hash(board_16x16) == before
+        board_16x16.children[0].rotate(1)
+        assert hash(board_16x16) == hash(board_16x16_rotate1)
+        assert board_16x16 != board_16x16_swap0
+
+
+class TestBlockObserver:
+    """A collection of methods that test the change records sent to the
+    observers of a Block.
+    """
+    def test_changes(self, board_16x16) -> None:
+        """Test that every move sends one change with the unit cells of the
+        moved block, to the observers of the block and of its ancestors.
+        """
+        changes = []
+        child_changes = []
+        board_16x16.subscribe(changes.append)
+        first = board_16x16.children[0]
+        first.subscribe(child_changes.append)
+
+        assert board_16x16.rotate(1)
+        assert first.swap(0)
+        assert first.children[2].paint(COLOUR_LIST[1])
+        assert board_16x16.children[2].smash()
+        assert changes == [
+            BlockChange('rotate', 1, board_16x16, 0, 0, 4),
+            BlockChange('swap', 0, first, 2, 2, 2),
+            BlockChange('paint', None, first.children[2], 2, 3, 1),
+            BlockChange('smash', None, board_16x16.children[2], 0, 2, 2)]
+        assert child_changes == changes[1:3]
+
+        first.unsubscribe(child_changes.append)
+        token = apply_move(('combine', None, first), COLOUR_LIST[0])
+        token.undo()
+        assert changes[-2:] == [
+            BlockChange('combine', None, first, 2, 2, 2),
+            BlockChange('restore', None, first, 2, 2, 2)]
+        assert len(child_changes) == 2
+
+
+class TestCompactBoard:
+    """A collection of methods that test the CompactBoard class against the
+    Block class.
+    """
+    def test_round_trip(self, board_16x16) -> None:
+        """Test that converting the reference board to a CompactBoard and back
+        gives an equivalent Block.
+        """
+        compact = CompactBoard.from_block(board_16x16)
+        assert len(compact) == 9
+        assert compact.to_block() == board_16x16
+
+    def test_same_as_generate_board(self) -> None:
+        """Test that a CompactBoard generated with the same seed as a Block
+        board has the same blocks.
+        """
+        random.seed(148)
+        board = generate_board(4, 750)
+        random.seed(148)
+        compact = generate_compact_board(4)
+        assert compact.to_block() == board
+
+    def test_moves(self, board_16x16, board_16x16_swap0,
+                   board_16x16_rotate1) -> None:
+        """Test that swap, rotate and combine on a CompactBoard match the
+        reference boards.
+        """
+        compact = CompactBoard.from_block(board_16x16)
+        copy = compact.create_copy()
+        assert compact.swap(0, 0)
+        assert compact.to_block() == board_16x16_swap0
+        assert copy.rotate(copy.child(0, 0), 1)
+        assert copy.to_block() == board_16x16_rotate1
+        assert copy.combine(copy.child(0, 0))
+        assert copy.colour(copy.child(0, 0)) == 1
+        assert len(copy) == 5
+
+
+class TestBulkGeneration:
+    """A collection of methods that test generating many boards with NumPy.
+    """
+    def test_generate_boards(self) -> None:
+        """Test that generated boards are valid and the same for the same seed.
+        """
+        pytest.importorskip('numpy')
+        from bulk import generate_boards
+
+        batch = generate_boards(50, 3, seed=148)
+        again = generate_boards(50, 3, seed=148)
+        assert len(batch) == 50
+        for i in range(len(batch)):
+            board = batch.to_block(i)
+            assert board == again.to_block(i)
+            assert len(board.children) == 4
+            for row in _flatten(board):
+                for colour in row:
+                    assert colour in COLOUR_LIST
+
+
+class TestPersistentBoard:
+    """A collection of methods that test the PersistentBoard class.
+    """
+    def test_copy_is_independent(self, board_16x16, board_16x16_swap0,
+                                 board_16x16_rotate1) -> None:
+        """Test that moves on a copy of a PersistentBoard do not affect the
+        board it was copied from, and the reverse.
+        """
+        board = PersistentBoard.from_block(board_16x16)
+        copy = board.create_copy()
+        assert copy == board
+        assert board.swap([], 0)
+        assert copy.rotate([0], 1)
+        assert board.to_block() == board_16x16_swap0
+        assert copy.to_block() == board_16x16_rotate1
+        assert copy != board
+
+    def test_paint_and_combine(self, board_16x16) -> None:
+        """Test that paint and combine follow the same rules as Block.
+        """
+        board = PersistentBoard.from_block(board_16x16)
+        assert not board.paint([1], COLOUR_LIST[0])
+        assert board.paint([0, 0], COLOUR_LIST[1])
+        assert board.combine([0])
+        assert board.colour([0]) == COLOUR_LIST[1]
+        assert not board.has_children([0])
+
+
+class TestMoveJournal:
+    """A collection of methods that test applying, undoing and redoing moves.
+    """
+    def test_undo_smash_and_combine(self, board_16x16) -> None:
+        """Test that undoing a smash and a combine restores the board, and that
+        redoing a smash gives back the same children.
+        """
+        original = board_16x16.create_copy()
+        journal = MoveJournal()
+        assert journal.apply(('smash', None, board_16x16.children[1]),
+                             COLOUR_LIST[0])
+        smashed = board_16x16.create_copy()
+        assert journal.apply(('combine', None, board_16x16.children[0]),
+                             COLOUR_LIST[0])
+        assert not journal.apply(('paint', None, board_16x16.children[3]),
+                                 COLOUR_LIST[0])
+        assert journal.undo() is not None
+        assert journal.undo() is not None
+        assert journal.undo() is None
+        assert board_16x16 == original
+        journal.redo()
+        assert board_16x16 == smashed
+
+    def test_undo_after_ancestor_moves(self, board_16x16) -> None:
+        """Test that moves on a block that was kept while its ancestors moved
+        are undone exactly.
+        """
+        original = board_16x16.create_copy()
+        child = board_16x16.children[0]
+        tokens = [apply_move(('rotate', 1, board_16x16), COLOUR_LIST[0]),
+                  apply_move(('swap', 1, child), COLOUR_LIST[0]),
+                  apply_move(('rotate', 3, board_16x16), COLOUR_LIST[0])]
+        moved = board_16x16.create_copy()
+        for token in reversed(tokens):
+            token.undo()
+        assert board_16x16 == original
+        for token in tokens:
+            token.redo()
+        assert board_16x16 == moved
+
+
+class TestSerialize:
+    """A collection of methods that test the binary encoding of boards and
+    corpus files.
+    """
+    def test_encode_round_trip(self, board_16x16) -> None:
+        """Test that decoding an encoded board gives back an equal board, with
+        two bits per colour.
+        """
+        encoded = encode_board(board_16x16)
+        assert decode_board(encoded) == board_16x16
+        # 9 header bytes, then 5 leaf or parent bits and 7 leaves of 2 bits
+        assert len(encoded) == 9 + 3
+
+    def test_corpus(self, tmp_path) -> None:
+        """Test that a corpus file gives back every board it was written with,
+        in any order.
+        """
+        random.seed(148)
+        boards = [generate_board(3, 750) for _ in range(20)]
+        path = str(tmp_path / 'boards.blk')
+        assert write_corpus(path, boards) == 20
+        with CorpusReader(path) as reader:
+            assert len(reader) == 20
+            assert reader[13] == boards[13]
+            assert list(reader) == boards
+            with pytest.raises(IndexError):
+                reader.raw(20)
+
+    def test_corpus_not_a_corpus(self, tmp_path) -> None:
+        """Test that an empty, short or foreign file is refused with a
+        ValueError.
+        """
+        for name, data in [('empty', b''), ('short', b'BLK'),
+                           ('foreign', b'x' * 64)]:
+            path = tmp_path / name
+            path.write_bytes(data)
+            with pytest.raises(ValueError):
+                CorpusReader(str(path))
+
+
+class TestBlob:
+    """A collection of methods that test the blob labelling functions.
+    """
+    def test_snake(self) -> None:
+        """Test a blob that winds through the whole grid, which is far larger
+        than the recursion limit allows for a recursive flood fill.
+        """
+        n = 64
+        grid = []
+        for i in range(n):
+            column = ['a'] * n
+            if i % 2 == 1:
+                column = ['b'] * n
+                column[0 if i % 4 == 1 else n - 1] = 'a'
+            grid.append(column)
+        assert largest_blobs(grid) == {'a': 32 * n + 32, 'b': n - 1}
+        assert largest_blob(grid, 'c') == 0
+
+    def test_runs_that_only_touch_at_corners(self) -> None:
+        """Test that runs of the same value in columns beside each other are
+        only joined when they share an edge.
+        """
+        grid = [['a', 'a', 'b', 'b'], ['b', 'b', 'a', 'a']]
+        assert largest_blobs(grid) == {'a': 2, 'b': 2}
+
+    def test_blob_summaries(self, board_16x16) -> None:
+        """Test that cached blob summaries stay exact across moves, and that
+        a move only merges the summaries on the path to the moved block.
+        """
+        colour = COLOUR_LIST[1]
+        assert board_16x16.blob_summary(colour).largest() == 4
+        kept = board_16x16.children[3].blob_summary(colour)
+        assert board_16x16.children[0].children[3].paint(colour)
+        assert board_16x16.blob_summary(colour).areas == [3, 4]
+        assert board_16x16.children[3].blob_summary(colour) is kept
+
+        random.seed(148)
+        for _ in range(50):
+            block = board_16x16
+            while block.children and random.random() < 0.7:
+                block = random.choice(block.children)
+            action = random.choice([('rotate', 1), ('rotate', 3), ('swap', 1),
+                                    ('smash', None), ('combine', None)])
+            apply_move((action[0], action[1], block), colour)
+            for target in COLOUR_LIST:
+                assert board_16x16.blob_summary(target).largest() == \
+                    largest_blob(_flatten(board_16x16), target)
+
 
 class TestPlayer:
     """A collection of methods for testing the methods and functions in the
@@ -283,6 +646,98 @@ class TestPlayer:
         assert _get_block(board_16x16, top_right, 2) == \
                board_16x16.children[0].children[0]
 
+    def test_get_block_matches_drawing(self) -> None:
+        """Test that every pixel on the diagonal of a board with rounded
+        block sizes gives the leaf drawn on top of it.
+        """
+        random.seed(148)
+        board = Block((0, 0), 750, COLOUR_LIST[0], 0, 5)
+        for _ in range(5):
+            for leaf in list(leaves(board)):
+                leaf.smash()
+        squares = list(leaves(board))
+        for i in range(750):
+            drawn = None
+            for leaf in squares:
+                x, y = leaf.position
+                if x <= i < x + leaf.size and y <= i < y + leaf.size:
+                    drawn = leaf
+            assert _get_block(board, (i, i), 5) is drawn
+
+    def test_time_budget(self, board_16x16) -> None:
+        """Test that a SmartPlayer with a time budget scores candidates until
+        the budget runs out, and counts them.
+        """
+        copy = board_16x16.create_copy()
+        player = SmartPlayer(0, BlobGoal(COLOUR_LIST[0]), 1, time_budget=50)
+        player.process_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                button=1))
+        start = time.perf_counter()
+        move = player.generate_move(board_16x16)
+        assert time.perf_counter() - start < 1
+        assert move is not None
+        assert player.evaluated > 1
+        assert board_16x16 == copy
+
+    def test_mcts_player(self, board_16x16) -> None:
+        """Test that an MCTSPlayer leaves the board unchanged, makes a legal
+        move, and reuses its tree when the board is the one it expected.
+        """
+        random.seed(148)
+        copy = board_16x16.create_copy()
+        goal = PerimeterGoal(COLOUR_LIST[0])
+        player = MCTSPlayer(0, goal, [BlobGoal(COLOUR_LIST[1])], 300)
+        player.process_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                button=1))
+        move = player.generate_move(board_16x16)
+        assert player.playouts == 300
+        assert board_16x16 == copy
+        assert move[0] == 'pass' or \
+            is_legal((move[0], move[1]), move[2], goal.colour)
+
+        player = MCTSPlayer(0, goal, iterations=300, horizon=2)
+        player.process_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                button=1))
+        move = player.generate_move(board_16x16)
+        assert move[0] not in ['pass', 'smash']
+        tree = player._tree
+        visits = tree.visits
+        apply_move(move, goal.colour)
+        assert player._search.find(tree, board_16x16) is tree
+        assert tree.visits == visits
+
+    def test_parallel_smart_player(self, board_16x16) -> None:
+        """Test that a SmartPlayer with worker processes leaves the board
+        unchanged, makes the same move as another player with the same seed,
+        and only makes legal moves.
+        """
+        copy = board_16x16.create_copy()
+        goal = BlobGoal(COLOUR_LIST[1])
+        found = []
+        for _ in range(2):
+            player = SmartPlayer(0, goal, 200, 2, 148)
+            player.process_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                    button=1))
+            try:
+                move = player.generate_move(board_16x16)
+            finally:
+                player.close()
+            assert board_16x16 == copy
+            found.append((move[0], move[1], move[2].path()))
+        assert found[0] == found[1]
+        assert move[0] == 'pass' or \
+            is_legal((move[0], move[1]), move[2], goal.colour)
+
+    def test_smart_player_keeps_random_stream(self) -> None:
+        """Test that making a SmartPlayer that scores in this process does not
+        draw from the random module.
+        """
+        random.seed(148)
+        expected = random.random()
+        random.seed(148)
+        SmartPlayer(0, BlobGoal(COLOUR_LIST[0]), 10, 1)
+        assert random.random() == expected
+
 
 class TestGoal:
     """A collection of methods for testing the sub-classes of Goal.
@@ -302,6 +757,21 @@ class TestGoal:
 
         assert result == flattened_board_16x16
 
+    def test_flatten_indices(self, board_16x16, flattened_board_16x16) \
+            -> None:
+        """Test that the NumPy flatten gives the palette index of every colour
+        of the reference board, and that scoring the array gives the same
+        scores as scoring the board.
+        """
+        pytest.importorskip('numpy')
+        grid = _flatten_indices(board_16x16)
+        assert grid.dtype.name == 'uint8'
+        assert [[COLOUR_LIST[index] for index in column]
+                for column in grid.tolist()] == flattened_board_16x16
+        for colour in COLOUR_LIST:
+            for goal in [BlobGoal(colour), PerimeterGoal(colour)]:
+                assert goal.score_grid(grid) == goal.score(board_16x16)
+
     def test_blob_goal(self, board_16x16) -> None:
         correct_scores = [
             (COLOUR_LIST[0], 1),
@@ -315,6 +785,13 @@ class TestGoal:
             goal = BlobGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_blob_goal_large_blob(self) -> None:
+        """Test that a blob of every unit cell of a deep board is measured
+        without reaching the recursion limit.
+        """
+        board = Block((0, 0), 750, COLOUR_LIST[2], 0, 8)
+        assert BlobGoal(COLOUR_LIST[2]).score(board) == 256 * 256
+
     def test_perimeter_goal(self, board_16x16):
         correct_scores = [
             (COLOUR_LIST[0], 2),
@@ -328,6 +805,148 @@ class TestGoal:
             goal = PerimeterGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_perimeter_tracker(self, board_16x16) -> None:
+        """Test that a PerimeterTracker keeps the scores of every colour exact
+        across moves and undos, and ignores moves inside the board.
+        """
+        tracker = PerimeterTracker(board_16x16)
+        inner = board_16x16.children[0].children[2]
+        assert inner.paint(COLOUR_LIST[0])
+        assert tracker._pending == []
+
+        random.seed(148)
+        journal = MoveJournal()
+        for _ in range(50):
+            block = board_16x16
+            while block.children and random.random() < 0.7:
+                block = random.choice(block.children)
+            action = random.choice([('rotate', 1), ('swap', 0), ('smash', None),
+                                    ('combine', None), ('paint', None)])
+            journal.apply((action[0], action[1], block),
+                          random.choice(COLOUR_LIST))
+            if random.random() < 0.3:
+                journal.undo()
+            for colour in COLOUR_LIST:
+                assert tracker.score(colour) == \
+                    PerimeterGoal(colour).score(board_16x16)
+        tracker.close()
+
+    def test_score_goals(self, board_16x16) -> None:
+        """Test that scoring every goal together gives the same scores as
+        scoring each goal on its own, with or without a flattened grid.
+        """
+        goals = [PerimeterGoal(colour) for colour in COLOUR_LIST] + \
+            [BlobGoal(colour) for colour in COLOUR_LIST]
+        expected = [goal.score(board_16x16) for goal in goals]
+        assert score_goals(board_16x16, goals) == expected
+        assert score_goals(board_16x16, goals, _flatten(board_16x16)) == \
+            expected
+
+
+class TestMoves:
+    """A collection of methods for testing the legal move generator.
+    """
+    def test_legal_moves(self) -> None:
+        """Test that legal_moves lists exactly the moves that apply_move
+        accepts, without changing the board.
+        """
+        random.seed(148)
+        for _ in range(20):
+            board = generate_board(3, 750)
+            copy = board.create_copy()
+            colour = random.choice(COLOUR_LIST)
+            moves = legal_moves(board, colour)
+            assert board == copy
+            assert len(moves) == count_legal_moves(board, colour)
+            assert legal_move_paths(board, colour) == \
+                [(move[0], move[1], tuple(move[2].path())) for move in moves]
+            expected = []
+            for block in preorder(board):
+                for action in MOVE_ACTIONS:
+                    token = apply_move((action[0], action[1], block), colour)
+                    if token is not None:
+                        token.undo()
+                        expected.append((action[0], action[1], id(block)))
+                    assert is_legal(action, block, colour) == \
+                        (token is not None)
+            assert sorted(expected) == \
+                sorted((move[0], move[1], id(move[2])) for move in moves)
+
+    def test_sample_moves(self, board_16x16) -> None:
+        """Test that sample_moves draws no move other than a smash twice, and
+        draws every move once, then smashes, when asked for at least as many
+        moves as there are.
+        """
+        random.seed(148)
+        moves = legal_moves(board_16x16, COLOUR_LIST[0])
+        drawn = list(sample_moves(moves, len(moves) - 1))
+        assert len(drawn) == len(moves) - 1
+        others = [id(move) for move in drawn if move[0] != 'smash']
+        assert len(others) == len(set(others))
+        drawn = list(sample_moves(moves, 5000))
+        assert drawn[:len(moves)] == moves
+        assert len(drawn) == 5000
+        assert all(move[0] == 'smash' for move in drawn[len(moves):])
+        paints = [move for move in moves if move[0] == 'paint']
+        assert list(sample_moves(paints, 5000)) == paints
+
+
+def test_palette() -> None:
+    """Test that the game plays with a palette of more than four colours,
+    stored as palette indices.
+    """
+    old = PALETTE[:], PALETTE_NAMES[:]
+    try:
+        set_palette(old[0] + [(234, 62, 112)], old[1] + ['Melon Mambo'])
+        assert COLOUR_LIST == [0, 1, 2, 3, 4]
+        assert colour_name(4) == 'Melon Mambo'
+        board = Block((0, 0), 750, 4, 0, 2)
+        assert BlobGoal(4).score(board) == 16
+        assert PerimeterGoal(4).score(board) == 16
+        assert decode_board(encode_board(board)) == board
+        with pytest.raises(ValueError):
+            set_palette([(0, 0, 0)], [])
+    finally:
+        set_palette(*old)
+    assert COLOUR_LIST == [0, 1, 2, 3]
+
+
+class TestCache:
+    """A collection of methods for testing the caches of boards and scores.
+    """
+    def test_lru(self) -> None:
+        """Test that an LRUCache forgets its least recently used entry and
+        counts its hits and misses.
+        """
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_scores(self, board_16x16) -> None:
+        """Test that a ScoreCache scores an unchanged board once, and scores
+        it again after a move.
+        """
+        cache = ScoreCache()
+        goal = BlobGoal(COLOUR_LIST[0])
+        score = cache.score(board_16x16, goal)
+        assert cache.score(board_16x16, goal) == score
+        assert (cache.scores.hits, cache.scores.misses) == (1, 1)
+        assert cache.flatten(board_16x16) is cache.flatten(board_16x16)
+
+        assert board_16x16.children[0].children[2].paint(COLOUR_LIST[0])
+        assert cache.score(board_16x16, goal) == goal.score(board_16x16)
+        assert cache.scores.misses == 2
+        goals = [PerimeterGoal(COLOUR_LIST[0]), goal]
+        assert cache.score_all(board_16x16, goals) == \
+            [other.score(board_16x16) for other in goals]
+        assert cache.scores.misses == 3
+
 
 if __name__ == '__main__':
     pytest.main(['example_tests.py'])
@@ -23,9 +23,17 @@ This file contains the hierarchy of Goal classes.
 """
 from __future__ import annotations
 import random
-from typing import List, Tuple
-from block import Block
+from typing import List, Optional
+from blob import largest_blob, largest_blobs
+from block import Block, BlockChange
 from settings import colour_name, COLOUR_LIST
+from traversal import edge_leaf_cells, leaf_cells
+
+try:
+    import numpy as np
+except ImportError:
+    # Without NumPy, the goals score the list returned by _flatten.
+    np = None
 
 
 def generate_goals(num_goals: int) -> List[Goal]:
@@ -58,7 +66,7 @@ def generate_goals(num_goals: int) -> List[Goal]:
     return lst
 
 
-def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
+def _flatten(block: Block) -> List[List[int]]:
     """Return a two-dimensional list representing <block> as rows and columns of
     unit cells.
 
@@ -67,39 +75,51 @@ def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
         - L[i] represents column i and
         - L[i][j] represents the unit cell at column i and row j.
 
-    Each unit cell is represented by a tuple of 3 ints, which is the colour
-    of the block at the cell location[i][j]
+    Each unit cell is represented by an int, which is the colour of the block
+    at the cell location[i][j] as an index into settings.PALETTE
 
     L[0][0] represents the unit cell in the upper left corner of the Block.
+
+    Each leaf is written directly into its columns of L, so no lists are
+    built for the levels in between.
     """
-    if not block.children and block.level == block.max_depth:
-        return [[block.colour]]
-    elif not block.children:
-        outer_list = []
-        count_goal = 2**(block.max_depth - block.level)
-        for _ in range(count_goal):
-            inner_list = []
-            for __ in range(count_goal):
-                inner_list.append(block.colour)
-            outer_list.append(inner_list)
-        return outer_list
-    else:
-        upper_left_list = _flatten(block.children[1])
-        lower_left_list = _flatten(block.children[2])
-        upper_right_list = _flatten(block.children[0])
-        lower_right_list = _flatten(block.children[3])
-        outer_list = []
-        for j in range(len(upper_left_list)):
-            inner_list = []
-            inner_list.extend(upper_left_list[j])
-            inner_list.extend(lower_left_list[j])
-            outer_list.append(inner_list)
-        for j in range(len(upper_right_list)):
-            inner_list = []
-            inner_list.extend(upper_right_list[j])
-            inner_list.extend(lower_right_list[j])
-            outer_list.append(inner_list)
-        return outer_list
+    count_goal = 2**(block.max_depth - block.level)
+    outer_list = []
+    for _ in range(count_goal):
+        outer_list.append([None] * count_goal)
+    for leaf, x, y, cells in leaf_cells(block):
+        column = [leaf.colour] * cells
+        for i in range(x, x + cells):
+            outer_list[i][y:y + cells] = column
+    return outer_list
+
+
+def _flatten_indices(block: Block) -> np.ndarray:
+    """Return a two-dimensional uint8 array representing <block> as columns
+    and rows of unit cells, in the same layout as _flatten.
+
+    A[i, j] is the colour, as a palette index, of the unit cell at
+    column i and row j. Each larger leaf fills its square of A with a single
+    slice assignment, and the leaves of a single unit cell, which are most of
+    the leaves, are all written by one indexed assignment.
+
+    Precondition: NumPy is installed.
+    """
+    count_goal = 2 ** (block.max_depth - block.level)
+    grid = np.empty((count_goal, count_goal), dtype=np.uint8)
+    columns = []
+    rows = []
+    colours = []
+    for leaf, x, y, cells in leaf_cells(block):
+        if cells == 1:
+            columns.append(x)
+            rows.append(y)
+            colours.append(leaf.colour)
+        else:
+            grid[x:x + cells, y:y + cells] = leaf.colour
+    if colours:
+        grid[columns, rows] = colours
+    return grid
 
 
 class Goal:
@@ -110,11 +130,11 @@ class Goal:
     === Attributes ===
     colour:
         The target colour for this goal, that is the colour to which
-        this goal applies.
+        this goal applies, as an index into settings.PALETTE.
     """
-    colour: Tuple[int, int, int]
+    colour: int
 
-    def __init__(self, target_colour: Tuple[int, int, int]) -> None:
+    def __init__(self, target_colour: int) -> None:
         """Initialize this goal to have the given target colour.
         """
         self.colour = target_colour
@@ -126,6 +146,12 @@ class Goal:
         """
         raise NotImplementedError
 
+    def score_grid(self, grid: np.ndarray) -> int:
+        """Return the score for this goal on the board flattened into <grid>
+        by _flatten_indices.
+        """
+        raise NotImplementedError
+
     def description(self) -> str:
         """Return a description of this goal.
         """
@@ -139,20 +165,20 @@ class PerimeterGoal(Goal):
     def score(self, board: Block) -> int:
         """Generates the score for this <board> based on self and returns the
         score
+
+        Only the leaves that touch the edge of <board> are visited.
         """
-        final_score = 0
-        flat = _flatten(board)
-        length = len(flat)
-        for i in range(length):
-            if flat[0][i] == self.colour:
-                final_score += 1
-            if flat[i][0] == self.colour:
-                final_score += 1
-            if flat[length - 1][i] == self.colour:
-                final_score += 1
-            if flat[i][length - 1] == self.colour:
-                final_score += 1
-        return final_score
+        return _perimeter_counts(board)[self.colour]
+
+    def score_grid(self, grid: np.ndarray) -> int:
+        """Return the number of target unit cells on the edges of <grid>,
+        counting the corners twice.
+        """
+        target = self.colour
+        return int(np.count_nonzero(grid[0] == target)
+                   + np.count_nonzero(grid[-1] == target)
+                   + np.count_nonzero(grid[:, 0] == target)
+                   + np.count_nonzero(grid[:, -1] == target))
 
     def description(self) -> str:
         """Returns a description of this goal
@@ -164,6 +190,146 @@ class PerimeterGoal(Goal):
         return string
 
 
+def _perimeter_counts(board: Block) -> List[int]:
+    """Return the PerimeterGoal score of every colour on the edge of <board>,
+    indexed by colour.
+
+    Only the leaves that touch the edge of <board> are visited. Each of them
+    adds its length in unit cells for every edge it touches, so the corners
+    are counted twice.
+    """
+    total = 2 ** (board.max_depth - board.level)
+    counts = [0] * len(COLOUR_LIST)
+    for leaf, x, y, cells in edge_leaf_cells(board):
+        edges = (x == 0) + (y == 0) + (x + cells == total) + \
+            (y + cells == total)
+        counts[leaf.colour] += edges * cells
+    return counts
+
+
+class PerimeterTracker:
+    """The perimeter scores of every colour on a board, kept up to date as the
+    board changes.
+
+    The tracker subscribes to the board and stores the colour of every unit
+    cell on its edges. A move whose unit cells do not touch an edge of the
+    board is ignored; otherwise the moved block is kept until a score is
+    asked for, and only then are the edge cells of the moved blocks read
+    again. A block that is moved several times, or that is inside another
+    moved block, is read only once.
+
+    === Public Attributes ===
+    board:
+        The board whose scores are tracked.
+    """
+    # === Private Attributes ===
+    # _edges:
+    #   The colours of the unit cells along the top, bottom, left and right
+    #   edges of the board, from left to right or from top to bottom, one byte
+    #   per cell.
+    # _counts:
+    #   The PerimeterGoal score of each colour, indexed by colour, which is
+    #   the number of times the colour appears in <_edges>, or None if
+    #   <_edges> changed since the scores were last counted.
+    # _pending:
+    #   The changes that touch an edge of the board and have not been read
+    #   into <_edges> yet.
+    board: Block
+    _edges: List[bytearray]
+    _counts: Optional[List[int]]
+    _pending: List[BlockChange]
+
+    def __init__(self, board: Block) -> None:
+        """Initialize this tracker with the scores of <board>, and subscribe
+        to the changes of <board>.
+        """
+        self.board = board
+        total = 2 ** (board.max_depth - board.level)
+        self._edges = [bytearray(total) for _ in range(4)]
+        self._counts = None
+        self._pending = []
+        self._update(board, 0, 0)
+        board.subscribe(self._changed)
+
+    def score(self, colour: int) -> int:
+        """Return the PerimeterGoal score of <colour> on the board.
+
+        The scores of all colours are counted again only if an edge cell
+        changed since they were last counted.
+        """
+        if self._pending:
+            self._flush()
+        if self._counts is None:
+            self._counts = [0] * len(COLOUR_LIST)
+            for edge in self._edges:
+                for value in set(edge):
+                    self._counts[value] += edge.count(value)
+        return self._counts[colour]
+
+    def close(self) -> None:
+        """Stop tracking changes to the board.
+        """
+        self.board.unsubscribe(self._changed)
+
+    def _changed(self, change: BlockChange) -> None:
+        """Record <change> if it may change the edges of the board.
+        """
+        total = len(self._edges[0])
+        if change.column == 0 or change.row == 0 or \
+                change.column + change.cells == total or \
+                change.row + change.cells == total:
+            self._pending.append(change)
+
+    def _flush(self) -> None:
+        """Read the edge cells of the blocks of the pending changes, largest
+        first, skipping those inside a block that was already read.
+
+        A block can only move to another place through a move on one of its
+        ancestors, so the unit cells recorded in a change are still those of
+        its block unless the change is inside a larger pending change.
+        """
+        done = []
+        for change in sorted(self._pending, key=lambda item: -item.cells):
+            column, row, cells = change.column, change.row, change.cells
+            if not any(x <= column and y <= row and
+                       column + cells <= x + size and row + cells <= y + size
+                       for x, y, size in done):
+                self._update(change.block, column, row)
+                done.append((column, row, cells))
+        self._pending = []
+
+    def _update(self, block: Block, column: int, row: int) -> None:
+        """Read the colours of the edge cells of the board that are in <block>,
+        whose upper left unit cell is at <column> and <row> of the board.
+        """
+        total = len(self._edges[0])
+        top, bottom, left, right = self._edges
+        self._counts = None
+        stack = [(block, column, row, 2 ** (block.max_depth - block.level))]
+        while stack:
+            current, x, y, cells = stack.pop()
+            if not (x == 0 or y == 0 or x + cells == total or
+                    y + cells == total):
+                continue
+            children = current.children
+            if children:
+                half = cells // 2
+                stack.append((children[0], x + half, y, half))
+                stack.append((children[1], x, y, half))
+                stack.append((children[2], x, y + half, half))
+                stack.append((children[3], x + half, y + half, half))
+                continue
+            segment = bytes((current.colour,)) * cells
+            if y == 0:
+                top[x:x + cells] = segment
+            if y + cells == total:
+                bottom[x:x + cells] = segment
+            if x == 0:
+                left[y:y + cells] = segment
+            if x + cells == total:
+                right[y:y + cells] = segment
+
+
 class BlobGoal(Goal):
     """A goal where the player's score is counted by the number of target blocks
     that are connected
@@ -171,65 +337,17 @@ class BlobGoal(Goal):
     def score(self, board: Block) -> int:
         """Generates the score for this <board> based on self and returns the
         score
+
+        The score comes from the blob summaries cached in <board>, so after a
+        move only the summaries along the path to the moved block are merged
+        again.
         """
-        final_score = []
-        flat = _flatten(board)
-        size_of_board = len(flat)
-        appearance = []
-        columns = []
-
-        for _ in range(size_of_board):
-            columns.append(-1)
-        for _ in range(size_of_board):
-            appearance.append(columns.copy())
-
-        for j in range(size_of_board):
-            for k in range(size_of_board):
-                if appearance[j][k] == -1:
-                    final_score.append(self._undiscovered_blob_size((j, k),
-                                                                    flat,
-                                                                    appearance))
-        return max(final_score)
-
-    def _undiscovered_blob_size(self, pos: Tuple[int, int],
-                                board: List[List[Tuple[int, int, int]]],
-                                visited: List[List[int]]) -> int:
-        """Return the size of the largest connected blob that (a) is of this
-        Goal's target colour, (b) includes the cell at <pos>, and (c) involves
-        only cells that have never been visited.
-
-        If <pos> is out of bounds for <board>, return 0.
-
-        <board> is the flattened board on which to search for the blob.
-        <visited> is a parallel structure that, in each cell, contains:
-            -1 if this cell has never been visited
-            0  if this cell has been visited and discovered
-               not to be of the target colour
-            1  if this cell has been visited and discovered
-               to be of the target colour
-
-        Update <visited> so that all cells that are visited are marked with
-        either 0 or 1.
-        """
-        if (pos[1] < 0 or pos[1] >= len(board[0])) or (pos[0] < 0
-                                                       or pos[0] >= len(board)):
-            return 0
-        elif visited[pos[0]][pos[1]] == 0 or visited[pos[0]][pos[1]] == 1:
-            return 0
-        elif board[pos[0]][pos[1]] != self.colour:
-            visited[pos[0]][pos[1]] = 0
-            return 0
-        else:
-            visited[pos[0]][pos[1]] = 1
-            start = self._undiscovered_blob_size((pos[0], pos[1] + 1), board,
-                                                 visited) + \
-                self._undiscovered_blob_size((pos[0], pos[1] - 1), board,
-                                             visited) + \
-                self._undiscovered_blob_size((pos[0] + 1, pos[1]), board,
-                                             visited) + \
-                self._undiscovered_blob_size((pos[0] - 1, pos[1]), board,
-                                             visited) + 1
-            return start
+        return board.blob_summary(self.colour).largest()
+
+    def score_grid(self, grid: np.ndarray) -> int:
+        """Return the size of the largest blob of target unit cells in <grid>.
+        """
+        return largest_blob(grid.tolist(), self.colour)
 
     def description(self) -> str:
         """Returns a description of this goal
@@ -241,12 +359,45 @@ class BlobGoal(Goal):
         return string
 
 
+def score_goals(board: Block, goals: List[Goal],
+                grid: Optional[List[List[int]]] = None) \
+        -> List[int]:
+    """Return the score of each goal in <goals> on <board>, in order.
+
+    However many goals there are, the edge of <board> is walked once for all
+    the PerimeterGoals. The BlobGoals are scored from the blob summaries
+    cached in <board>, unless <grid> is given, in which case the blobs of the
+    flattened <board> in <grid> are labelled once for all of them.
+    """
+    perimeter = []
+    if any(isinstance(goal, PerimeterGoal) for goal in goals):
+        perimeter = _perimeter_counts(board)
+    blobs = {}
+    blob_colours = [goal.colour for goal in goals if isinstance(goal, BlobGoal)]
+    if blob_colours:
+        if grid is None:
+            for colour in blob_colours:
+                blobs[colour] = board.blob_summary(colour).largest()
+        else:
+            blobs = largest_blobs(grid, blob_colours)
+
+    scores = []
+    for goal in goals:
+        if isinstance(goal, PerimeterGoal):
+            scores.append(perimeter[goal.colour])
+        elif isinstance(goal, BlobGoal):
+            scores.append(blobs[goal.colour])
+        else:
+            scores.append(goal.score(board))
+    return scores
+
+
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'block', 'settings',
-            'math', '__future__'
+            'math', '__future__', 'traversal', 'numpy', 'blob'
         ],
         'max-attributes': 15
     })
@@ -0,0 +1,209 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the functions and classes used to apply moves to a board in
+place and to undo and redo them exactly.
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE
+from block import Block
+
+
+class UndoToken:
+    """A record of one move that was applied to a board, which can be used to
+    undo and redo that move.
+
+    === Public Attributes ===
+    move:
+        The move that was applied, as returned by Player.generate_move.
+    """
+    # === Private Attributes ===
+    # _before:
+    #   The colour and children of the moved block before the move, or None
+    #   if the move is a rotate, swap or pass.
+    # _after:
+    #   The colour and children of the moved block after the move, or None
+    #   if the move is a rotate, swap or pass.
+    move: Tuple[str, Optional[int], Block]
+    _before: Optional[Tuple[Optional[int], List[Block]]]
+    _after: Optional[Tuple[Optional[int], List[Block]]]
+
+    def __init__(self, move: Tuple[str, Optional[int], Block],
+                 before: Optional[Tuple[Optional[int], List[Block]]]) \
+            -> None:
+        """Initialize this token for a <move> that has just been applied.
+
+        <before> is the colour and children of the moved block before the
+        move, or None if the move is a rotate, swap or pass.
+        """
+        self.move = move
+        self._before = before
+        self._after = None
+        if before is not None:
+            block = move[2]
+            self._after = (block.colour, list(block.children))
+
+    def undo(self) -> None:
+        """Revert the move recorded by this token.
+
+        Precondition: the board has not changed since the move was applied or
+        redone, other than by moves that have since been undone.
+        """
+        action = (self.move[0], self.move[1])
+        block = self.move[2]
+        if action == ROTATE_CLOCKWISE:
+            block.rotate(ROTATE_COUNTER_CLOCKWISE[1])
+        elif action == ROTATE_COUNTER_CLOCKWISE:
+            block.rotate(ROTATE_CLOCKWISE[1])
+        elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+            block.swap(self.move[1])
+        elif self._before is not None:
+            _restore(block, self._before)
+
+    def redo(self) -> None:
+        """Apply the move recorded by this token again, exactly as it was
+        first applied.
+
+        A redone smash gets back the same children it first created.
+
+        Precondition: the move has just been undone.
+        """
+        action = (self.move[0], self.move[1])
+        block = self.move[2]
+        if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+            block.rotate(self.move[1])
+        elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+            block.swap(self.move[1])
+        elif self._after is not None:
+            _restore(block, self._after)
+
+
+def _restore(block: Block, state: Tuple[Optional[int], List[Block]]) -> None:
+    """Set the colour and children of <block> to those saved in <state>.
+    """
+    block.children = list(state[1])
+    block.colour = state[0]
+    block._notify('restore', None)
+
+
+def apply_move(move: Tuple[str, Optional[int], Block],
+               colour: int) -> Optional[UndoToken]:
+    """Apply <move> to the block it refers to, in place.
+
+    <colour> is the colour used by a paint move.
+
+    Return a token that can undo the move, or None if the move was not valid,
+    in which case nothing was changed.
+    """
+    action = (move[0], move[1])
+    block = move[2]
+    before = None
+    if action in [SMASH, PAINT, COMBINE]:
+        block.refresh()
+        before = (block.colour, list(block.children))
+
+    if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+        move_successful = block.rotate(move[1])
+    elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+        move_successful = block.swap(move[1])
+    elif action == SMASH:
+        move_successful = block.smash()
+    elif action == PAINT:
+        move_successful = block.paint(colour)
+    elif action == COMBINE:
+        move_successful = block.combine()
+    else:
+        move_successful = action == PASS
+
+    if not move_successful:
+        return None
+    return UndoToken(move, before)
+
+
+class MoveJournal:
+    """The history of moves applied to a board, with undo and redo.
+    """
+    # === Private Attributes ===
+    # _done:
+    #   The tokens of the moves that are currently applied, oldest first.
+    # _undone:
+    #   The tokens of the moves that have been undone and can be redone, most
+    #   recently undone last.
+    _done: List[UndoToken]
+    _undone: List[UndoToken]
+
+    def __init__(self) -> None:
+        """Initialize an empty journal.
+        """
+        self._done = []
+        self._undone = []
+
+    def apply(self, move: Tuple[str, Optional[int], Block],
+              colour: int) -> bool:
+        """Apply <move> in place and record it in this journal.
+
+        <colour> is the colour used by a paint move. Applying a move discards
+        the moves that could be redone.
+
+        Return True iff the move was valid.
+        """
+        token = apply_move(move, colour)
+        if token is None:
+            return False
+        self._done.append(token)
+        self._undone = []
+        return True
+
+    def undo(self) -> Optional[Tuple[str, Optional[int], Block]]:
+        """Undo the most recent move and return it, or return None if there is
+        no move to undo.
+        """
+        if not self._done:
+            return None
+        token = self._done.pop()
+        token.undo()
+        self._undone.append(token)
+        return token.move
+
+    def redo(self) -> Optional[Tuple[str, Optional[int], Block]]:
+        """Redo the most recently undone move and return it, or return None if
+        there is no move to redo.
+        """
+        if not self._undone:
+            return None
+        token = self._undone.pop()
+        token.redo()
+        self._done.append(token)
+        return token.move
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'actions', 'block'
+        ],
+        'max-attributes': 15
+    })
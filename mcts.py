@@ -0,0 +1,350 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a Monte Carlo Tree Search over the turns of a game.
+
+Each node of the search tree is the board after a sequence of moves, one per
+turn, made by the players in turn order. Every iteration selects a path down
+the tree with UCT, adds one new node, finishes the turns up to the horizon
+with random moves, and scores the board for every player: their goal score
+minus the penalties of the moves they made on the way. Each node on the path
+is credited with the reward of the player who made its move.
+
+Each goal is scored with its own incremental scorer, which reads the blob
+summaries or walks the edge of the board without flattening it. Applying and
+undoing a move only invalidates the summaries along the path to the moved
+block, so most of them stay cached across iterations.
+
+The iterations work on the board itself. Every move is applied in place and
+undone at the end of the iteration, and each node keeps the UndoToken of its
+move so later iterations redo it exactly, including the children its smash
+created. A node also keeps the path to its block, so its move can be found
+again on a board that was changed and changed back by other means, such as
+the moves of a real game.
+"""
+from __future__ import annotations
+import math
+import random
+import time
+from typing import List, Optional, Tuple
+
+from actions import ACTION_PENALTY, PASS
+from block import Block
+from goal import Goal
+from journal import UndoToken, apply_move
+from moves import MOVE_ACTIONS, is_legal, legal_move_paths, legal_moves, \
+    random_move
+
+# The number of random blocks and actions tried by a playout move before it
+# falls back to listing every legal move.
+_PLAYOUT_TRIES = 20
+
+
+class SearchNode:
+    """A node of the search tree.
+
+    === Public Attributes ===
+    move:
+        The move that leads to this node from its parent, with the path to
+        its block in place of the block, or None for the root.
+    mover:
+        The index of the player who made <move>, or None for the root.
+    to_move:
+        The index of the player whose turn it is at this node.
+    key:
+        The structural hash of the board at this node.
+    visits:
+        The number of iterations that went through this node.
+    value:
+        The total reward of <mover> over those iterations.
+    children:
+        The nodes reached by the moves that have been tried from this node.
+    untried:
+        The legal moves from this node that have no node yet, or None if
+        they have not been listed.
+    token:
+        The token of <move> the last time it was applied, or None if it has
+        not been applied to the board being searched.
+    """
+    move: Optional[Tuple[str, Optional[int], Tuple[int, ...]]]
+    mover: Optional[int]
+    to_move: int
+    key: int
+    visits: int
+    value: float
+    children: List[SearchNode]
+    untried: Optional[List[Tuple[str, Optional[int], Tuple[int, ...]]]]
+    token: Optional[UndoToken]
+
+    def __init__(self, move: Optional[Tuple[str, Optional[int],
+                                            Tuple[int, ...]]],
+                 mover: Optional[int], to_move: int, key: int) -> None:
+        """Initialize an unvisited node reached by <move>, made by <mover>,
+        where it is then the turn of <to_move> and the board has the
+        structural hash <key>.
+        """
+        self.move = move
+        self.mover = mover
+        self.to_move = to_move
+        self.key = key
+        self.visits = 0
+        self.value = 0.0
+        self.children = []
+        self.untried = None
+        self.token = None
+
+
+def _block_at(board: Block, path: Tuple[int, ...]) -> Optional[Block]:
+    """Return the block of <board> at <path>, or None if <board> has no block
+    there.
+    """
+    block = board
+    for index in path:
+        children = block.children
+        if not children:
+            return None
+        block = children[index]
+    return block
+
+
+def _playout_move(board: Block, colour: int) \
+        -> Optional[Tuple[str, Optional[int], Block]]:
+    """Return a random legal move on <board>, where <colour> is the colour
+    used by a paint, or None if there is no legal move.
+
+    A random block and action are tried a few times with the side-effect-free
+    predicates first, which is much faster than listing every legal move.
+    """
+    for _ in range(_PLAYOUT_TRIES):
+        block = board
+        for _ in range(random.randint(0, board.max_depth - board.level)):
+            children = block.children
+            if not children:
+                break
+            block = children[random.randrange(4)]
+        action = MOVE_ACTIONS[random.randrange(len(MOVE_ACTIONS))]
+        if is_legal(action, block, colour):
+            return action[0], action[1], block
+    return random_move(legal_moves(board, colour))
+
+
+class MonteCarloSearch:
+    """A Monte Carlo Tree Search over the turns of the players with <goals>.
+
+    === Public Attributes ===
+    goals:
+        The goal of each player, in turn order, starting with the player the
+        search is for.
+    horizon:
+        The number of turns looked ahead from the root.
+    exploration:
+        The UCT exploration constant.
+
+    === Representation Invariants ===
+    - len(goals) >= 1
+    - horizon >= 1
+    """
+    goals: List[Goal]
+    horizon: int
+    exploration: float
+
+    def __init__(self, goals: List[Goal], horizon: int,
+                 exploration: float = math.sqrt(2)) -> None:
+        """Initialize a search for the players with <goals> that looks
+        <horizon> turns ahead.
+        """
+        self.goals = goals
+        self.horizon = horizon
+        self.exploration = exploration
+
+    def new_root(self, board: Block) -> SearchNode:
+        """Return a new root for a search on <board> at the turn of the first
+        player.
+        """
+        return SearchNode(None, None, 0, board.structure_hash())
+
+    def run(self, board: Block, root: SearchNode,
+            iterations: Optional[int], deadline: Optional[float]) -> int:
+        """Run iterations of the search on <board> from <root>, until
+        <iterations> have run or the time.time() <deadline> has passed, and
+        return the number of iterations run.
+
+        <board> is left unchanged.
+
+        Precondition: iterations is not None or deadline is not None
+        """
+        count = 0
+        while (iterations is None or count < iterations) and \
+                (deadline is None or time.time() < deadline):
+            self._iterate(board, root)
+            count += 1
+        return count
+
+    def best_move(self, root: SearchNode) -> Optional[SearchNode]:
+        """Return the most visited child of <root>, or None if <root> has no
+        children.
+        """
+        best = None
+        for child in root.children:
+            if best is None or child.visits > best.visits:
+                best = child
+        return best
+
+    def find(self, node: SearchNode, board: Block) -> Optional[SearchNode]:
+        """Return a node in the subtree of <node>, fewer than len(goals) turns
+        below it, where it is the turn of the first player and the board has
+        the same structural hash as <board>, or None if there is none.
+
+        The node returned is made a root: the tokens in its subtree are
+        dropped, since they may refer to blocks that are no longer in
+        <board>, and its moves will be found again by their paths.
+        """
+        key = board.structure_hash()
+        level = [node]
+        found = None
+        for _ in range(len(self.goals)):
+            for candidate in level:
+                if candidate.to_move == 0 and candidate.key == key:
+                    found = candidate
+                    break
+            if found is not None:
+                break
+            level = [child for candidate in level
+                     for child in candidate.children]
+        if found is None:
+            return None
+        found.move = None
+        found.mover = None
+        stack = [found]
+        while stack:
+            current = stack.pop()
+            current.token = None
+            stack.extend(current.children)
+        return found
+
+    def _uct_child(self, node: SearchNode) -> SearchNode:
+        """Return the child of <node> with the highest UCT value.
+
+        Precondition: every child of <node> has been visited.
+        """
+        scale = self.exploration * math.sqrt(math.log(node.visits))
+        best = None
+        best_value = 0.0
+        for child in node.children:
+            value = child.value / child.visits + \
+                scale / math.sqrt(child.visits)
+            if best is None or value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def _apply(self, board: Block, node: SearchNode) -> bool:
+        """Apply the move of <node> to <board>, and return True iff it could
+        be made.
+        """
+        if node.token is not None:
+            node.token.redo()
+            return True
+        action, direction, path = node.move
+        block = _block_at(board, path)
+        if block is None:
+            return False
+        colour = self.goals[node.mover].colour
+        if action != PASS[0] and not is_legal((action, direction), block,
+                                              colour):
+            return False
+        node.token = apply_move((action, direction, block), colour)
+        return True
+
+    def _iterate(self, board: Block, root: SearchNode) -> None:
+        """Run one iteration of the search on <board> from <root>, and undo
+        its moves.
+        """
+        players = len(self.goals)
+        penalties = [0] * players
+        tokens = []
+        path = [root]
+        node = root
+        turn = 0
+        while turn < self.horizon:
+            if node.untried is None:
+                node.untried = legal_move_paths(board,
+                                                self.goals[node.to_move].colour)
+                node.untried.append((PASS[0], PASS[1], ()))
+            if node.untried:
+                # Expand one untried move of <node>.
+                move = node.untried.pop(random.randrange(len(node.untried)))
+                child = SearchNode(move, node.to_move,
+                                   (node.to_move + 1) % players, 0)
+                if not self._apply(board, child):
+                    break
+                child.key = board.structure_hash()
+                node.children.append(child)
+            elif node.children:
+                child = self._uct_child(node)
+                if not self._apply(board, child):
+                    # A board reached again after a tree was reused may no
+                    # longer allow this move, so forget it.
+                    node.children.remove(child)
+                    break
+            else:
+                break
+            tokens.append(child.token)
+            penalties[child.mover] += ACTION_PENALTY[(child.move[0],
+                                                      child.move[1])]
+            path.append(child)
+            node = child
+            turn += 1
+            if child.visits == 0:
+                break
+
+        # Play the remaining turns at random.
+        to_move = node.to_move
+        while turn < self.horizon:
+            move = _playout_move(board, self.goals[to_move].colour)
+            if move is not None:
+                tokens.append(apply_move(move, self.goals[to_move].colour))
+                penalties[to_move] += ACTION_PENALTY[(move[0], move[1])]
+            to_move = (to_move + 1) % players
+            turn += 1
+
+        cells = 2 ** (board.max_depth - board.level)
+        scale = max(cells * cells, 4 * cells)
+        rewards = [(self.goals[i].score(board) - penalties[i]) / scale
+                   for i in range(players)]
+        for token in reversed(tokens):
+            token.undo()
+
+        root.visits += 1
+        for visited in path[1:]:
+            visited.visits += 1
+            visited.value += rewards[visited.mover]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'math', 'random', 'time', 'typing',
+            '__future__', 'actions', 'block', 'goal', 'journal', 'moves'
+        ]
+    })
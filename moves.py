@@ -0,0 +1,226 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the legal move generator.
+
+Each predicate answers whether one action would succeed on a block, by the
+same rules as the Block method that performs it, without changing or copying
+the block. legal_moves lists every move other than PASS that would succeed on
+a board, so a player can draw a uniformly random legal move from the list in
+constant time instead of trying random moves until one succeeds.
+
+A list of legal moves stays valid while the moves drawn from it are applied
+and undone, since undoing a move puts back the same Block objects. Each move
+in the list is a distinct (action, direction, block), so sample_moves draws
+from it without replacement to avoid scoring the same move twice.
+"""
+from __future__ import annotations
+import random
+from typing import Iterator, List, Optional, Tuple
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, COMBINE, PAINT
+from block import Block
+from traversal import preorder
+
+# Every action other than PASS, in the order their moves are listed.
+MOVE_ACTIONS = [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, SWAP_HORIZONTAL,
+                SWAP_VERTICAL, SMASH, COMBINE, PAINT]
+
+
+def can_rotate(block: Block) -> bool:
+    """Return True iff <block> can be rotated.
+    """
+    return len(block.children) != 0
+
+
+def can_swap(block: Block) -> bool:
+    """Return True iff <block> can be swapped.
+    """
+    return len(block.children) != 0
+
+
+def can_smash(block: Block) -> bool:
+    """Return True iff <block> can be smashed.
+    """
+    return block.smashable()
+
+
+def can_combine(block: Block) -> bool:
+    """Return True iff <block> can be combined.
+    """
+    return block.majority_colour() is not None
+
+
+def can_paint(block: Block, colour: int) -> bool:
+    """Return True iff <block> can be painted with <colour>.
+    """
+    return not block.children and block.level == block.max_depth \
+        and block.colour != colour
+
+
+def is_legal(action: Tuple[str, Optional[int]], block: Block,
+             colour: int) -> bool:
+    """Return True iff <action> would succeed on <block>, where <colour> is
+    the colour used by a paint.
+    """
+    if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+        return can_rotate(block)
+    elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+        return can_swap(block)
+    elif action == SMASH:
+        return can_smash(block)
+    elif action == COMBINE:
+        return can_combine(block)
+    elif action == PAINT:
+        return can_paint(block, colour)
+    return False
+
+
+def legal_moves(board: Block, colour: int) \
+        -> List[Tuple[str, Optional[int], Block]]:
+    """Return every move other than PASS that would succeed on <board> or one
+    of its descendants, where <colour> is the colour used by a paint.
+
+    <board> is not changed.
+    """
+    moves = []
+    for block in preorder(board):
+        if block.children:
+            moves.append((ROTATE_CLOCKWISE[0], ROTATE_CLOCKWISE[1], block))
+            moves.append((ROTATE_COUNTER_CLOCKWISE[0],
+                          ROTATE_COUNTER_CLOCKWISE[1], block))
+            moves.append((SWAP_HORIZONTAL[0], SWAP_HORIZONTAL[1], block))
+            moves.append((SWAP_VERTICAL[0], SWAP_VERTICAL[1], block))
+            if can_combine(block):
+                moves.append((COMBINE[0], COMBINE[1], block))
+        elif can_smash(block):
+            moves.append((SMASH[0], SMASH[1], block))
+        elif can_paint(block, colour):
+            moves.append((PAINT[0], PAINT[1], block))
+    return moves
+
+
+def legal_move_paths(board: Block, colour: int) \
+        -> List[Tuple[str, Optional[int], Tuple[int, ...]]]:
+    """Return the moves of legal_moves(<board>, <colour>) in the same order,
+    with the path from <board> to the block of each move, as the indices of
+    the children to follow, in place of the block.
+
+    <board> is not changed.
+    """
+    moves = []
+    stack = [(board, ())]
+    while stack:
+        block, path = stack.pop()
+        children = block.children
+        if children:
+            moves.append((ROTATE_CLOCKWISE[0], ROTATE_CLOCKWISE[1], path))
+            moves.append((ROTATE_COUNTER_CLOCKWISE[0],
+                          ROTATE_COUNTER_CLOCKWISE[1], path))
+            moves.append((SWAP_HORIZONTAL[0], SWAP_HORIZONTAL[1], path))
+            moves.append((SWAP_VERTICAL[0], SWAP_VERTICAL[1], path))
+            if can_combine(block):
+                moves.append((COMBINE[0], COMBINE[1], path))
+            for i in range(3, -1, -1):
+                stack.append((children[i], path + (i,)))
+        elif can_smash(block):
+            moves.append((SMASH[0], SMASH[1], path))
+        elif can_paint(block, colour):
+            moves.append((PAINT[0], PAINT[1], path))
+    return moves
+
+
+def count_legal_moves(board: Block, colour: int) -> int:
+    """Return the number of moves that legal_moves would return.
+    """
+    count = 0
+    for block in preorder(board):
+        if block.children:
+            count += 4 + can_combine(block)
+        elif can_smash(block) or can_paint(block, colour):
+            count += 1
+    return count
+
+
+def block_at(board: Block, path: List[int]) -> Block:
+    """Return the block of <board> reached by following the children at the
+    indices in <path>, as returned by Block.path.
+    """
+    block = board
+    for index in path:
+        block = block.children[index]
+    return block
+
+
+def random_move(moves: List[Tuple[str, Optional[int], Block]]) \
+        -> Optional[Tuple[str, Optional[int], Block]]:
+    """Return a move drawn uniformly at random from <moves>, or None if
+    <moves> is empty.
+    """
+    if not moves:
+        return None
+    return moves[random.randrange(len(moves))]
+
+
+def sample_moves(moves: List[Tuple[str, Optional[int], Block]],
+                 count: Optional[int] = None) \
+        -> Iterator[Tuple[str, Optional[int], Block]]:
+    """Yield <count> moves drawn uniformly at random from <moves>, without
+    drawing any move twice except a smash.
+
+    A smash gives new random children every time it is made, so each draw of
+    a smash is a new sample and it stays in the draw. If <count> is at least
+    len(<moves>), every move in <moves> is yielded once, in order, and the
+    rest of the draws are smashes drawn uniformly at random, if there are any
+    smashes in <moves>.
+
+    If <count> is None, keep drawing until every move has been drawn and no
+    smash is left, which is never if there is a smash in <moves>.
+    """
+    if count is not None and count >= len(moves):
+        yield from moves
+        smashes = [move for move in moves if move[0] == SMASH[0]]
+        if smashes:
+            for _ in range(count - len(moves)):
+                yield smashes[random.randrange(len(smashes))]
+        return
+    remaining = list(moves)
+    drawn = 0
+    while remaining and (count is None or drawn < count):
+        drawn += 1
+        i = random.randrange(len(remaining))
+        move = remaining[i]
+        if move[0] != SMASH[0]:
+            remaining[i] = remaining[-1]
+            remaining.pop()
+        yield move
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', '__future__',
+            'actions', 'block', 'traversal'
+        ]
+    })
@@ -0,0 +1,344 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the PersistentBoard class, a copy-on-write variant of the
+Block tree.
+
+The nodes of a PersistentBoard are never changed once they are created. A move
+builds new nodes only along the path from the root to the block that changed,
+and shares every other node with the board it was made from. Copying a board
+therefore takes constant time, and many hypothetical boards can be branched
+from one board for little memory.
+"""
+from __future__ import annotations
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import random
+import math
+
+from block import Block
+from settings import COLOUR_LIST
+
+# The order of the children after each swap, indexed by direction, and after
+# each number of clockwise quarter turns. The child at index i after the move
+# is the child at index order[i] before it.
+_SWAP_ORDER = {0: (1, 0, 3, 2), 1: (3, 2, 1, 0)}
+_TURN_ORDER = [(0, 1, 2, 3), (1, 2, 3, 0), (2, 3, 0, 1), (3, 0, 1, 2)]
+
+
+class _Node(NamedTuple):
+    """An immutable block of a PersistentBoard.
+
+    <colour> is the colour of a leaf, or None for a block with children.
+    <children> are the four children in the usual order, before <turns>
+    clockwise quarter turns of the whole subtree are applied to them.
+    """
+    colour: Optional[int]
+    children: Tuple[_Node, ...]
+    turns: int
+
+
+# Leaves are shared between every board, one per colour.
+_LEAVES = {colour: _Node(colour, (), 0) for colour in COLOUR_LIST}
+
+
+def _leaf(colour: int) -> _Node:
+    """Return a leaf node of <colour>.
+    """
+    if colour not in _LEAVES:
+        _LEAVES[colour] = _Node(colour, (), 0)
+    return _LEAVES[colour]
+
+
+def _turned(node: _Node, turns: int) -> _Node:
+    """Return <node> after <turns> more clockwise quarter turns.
+    """
+    if not node.children or turns == 0:
+        return node
+    return _Node(None, node.children, (node.turns + turns) % 4)
+
+
+def _children_of(node: _Node) -> List[_Node]:
+    """Return the children of <node> in their current order, with the pending
+    turns of <node> passed on to them.
+    """
+    if node.turns == 0:
+        return list(node.children)
+    order = _TURN_ORDER[node.turns]
+    return [_turned(node.children[i], node.turns) for i in order]
+
+
+def _random_node(level: int, max_depth: int) -> _Node:
+    """Return a node at <level> with four randomly generated children,
+    generated by the same rules and in the same order as Block.smash.
+
+    Precondition: level < max_depth
+    """
+    colours = []
+    for _ in range(4):
+        colours.append(COLOUR_LIST[random.randint(0, len(COLOUR_LIST) - 1)])
+    children = [_leaf(colour) for colour in colours]
+    if level < max_depth - 1:
+        subdivide = []
+        for _ in range(4):
+            subdivide.append(random.random())
+        for i in range(4):
+            if subdivide[i] < math.exp(-0.25 * (level + 1)):
+                children[i] = _random_node(level + 1, max_depth)
+    return _Node(None, tuple(children), 0)
+
+
+def _majority_colour(node: _Node) -> Optional[int]:
+    """Return the colour that Block.combine would give <node>, or None if its
+    children have no majority colour.
+    """
+    counts = [0] * len(COLOUR_LIST)
+    for child in node.children:
+        counts[child.colour] += 1
+    maxed = max(counts)
+    colour = counts.index(maxed)
+    if maxed <= 1 or (maxed == 2 and counts.count(2) == 2):
+        return None
+    return colour
+
+
+def _equal(first: _Node, second: _Node) -> bool:
+    """Return True iff <first> and <second> describe the same blocks.
+    """
+    stack = [(first, second)]
+    while stack:
+        mine, theirs = stack.pop()
+        if mine is theirs:
+            continue
+        if mine.colour != theirs.colour or \
+                len(mine.children) != len(theirs.children):
+            return False
+        stack.extend(zip(_children_of(mine), _children_of(theirs)))
+    return True
+
+
+class PersistentBoard:
+    """A Blocky board whose blocks are shared with the boards it is copied
+    from.
+
+    Blocks are identified by their path from the root: the list of child
+    indices to follow, in the usual order of upper-right, upper-left,
+    lower-left and lower-right. The root has the empty path.
+
+    === Public Attributes ===
+    position:
+        The (x, y) coordinates of the upper left corner of the board.
+    size:
+        The height and width of the board.
+    max_depth:
+        The deepest level allowed in the board.
+    """
+    # === Private Attributes ===
+    # _root:
+    #   The root node of the board. It may be shared with other boards.
+    position: Tuple[int, int]
+    size: int
+    max_depth: int
+    _root: _Node
+
+    def __init__(self, position: Tuple[int, int], size: int,
+                 colour: int, max_depth: int) -> None:
+        """Initialize this board as a single block of <colour>, with its upper
+        left corner at <position> and dimensions <size> by <size>.
+        """
+        self.position = position
+        self.size = size
+        self.max_depth = max_depth
+        self._root = _leaf(colour)
+
+    def __eq__(self, other: PersistentBoard) -> bool:
+        """Return True iff this board and <other> are equivalent, with the same
+        rules as Block.__eq__.
+        """
+        return self.position == other.position and self.size == other.size \
+            and self.max_depth == other.max_depth \
+            and _equal(self._root, other._root)
+
+    def _path_nodes(self, path: Sequence[int]) -> List[_Node]:
+        """Return the nodes from the root to the block at <path>, inclusive.
+
+        Precondition: every node along <path> except the last has children.
+        """
+        nodes = [self._root]
+        for index in path:
+            nodes.append(_children_of(nodes[-1])[index])
+        return nodes
+
+    def _replace(self, path: Sequence[int], nodes: List[_Node],
+                 new_node: _Node) -> None:
+        """Replace the block at <path> with <new_node>, copying only the
+        ancestors of the block.
+
+        <nodes> are the nodes from the root to the block at <path>.
+        """
+        for depth in range(len(path) - 1, -1, -1):
+            children = _children_of(nodes[depth])
+            children[path[depth]] = new_node
+            new_node = _Node(None, tuple(children), 0)
+        self._root = new_node
+
+    def colour(self, path: Sequence[int]) -> Optional[int]:
+        """Return the colour of the block at <path>, or None if it has
+        children.
+        """
+        return self._path_nodes(path)[-1].colour
+
+    def has_children(self, path: Sequence[int]) -> bool:
+        """Return True iff the block at <path> has children.
+        """
+        return bool(self._path_nodes(path)[-1].children)
+
+    def smash(self, path: Sequence[int]) -> bool:
+        """Sub-divide the block at <path> so that it has four randomly
+        generated children.
+
+        Return True iff the smash was performed.
+        """
+        nodes = self._path_nodes(path)
+        if len(path) == self.max_depth or nodes[-1].children:
+            return False
+        self._replace(path, nodes, _random_node(len(path), self.max_depth))
+        return True
+
+    def swap(self, path: Sequence[int], direction: int) -> bool:
+        """Swap the children of the block at <path> horizontally if
+        <direction> is 0 and vertically if <direction> is 1.
+
+        Return True iff the swap was performed.
+        """
+        nodes = self._path_nodes(path)
+        if not nodes[-1].children or direction not in _SWAP_ORDER:
+            return False
+        children = _children_of(nodes[-1])
+        swapped = tuple(children[i] for i in _SWAP_ORDER[direction])
+        self._replace(path, nodes, _Node(None, swapped, 0))
+        return True
+
+    def rotate(self, path: Sequence[int], direction: int) -> bool:
+        """Rotate the block at <path> and all its descendants clockwise if
+        <direction> is 1 and counter-clockwise if <direction> is 3.
+
+        Return True iff the rotate was performed.
+        """
+        nodes = self._path_nodes(path)
+        if not nodes[-1].children:
+            return False
+        self._replace(path, nodes, _turned(nodes[-1], direction))
+        return True
+
+    def paint(self, path: Sequence[int], colour: int) -> bool:
+        """Change the colour of the block at <path> to <colour> iff it is a
+        leaf at max_depth and its colour is different from <colour>.
+
+        Return True iff the colour was changed.
+        """
+        nodes = self._path_nodes(path)
+        if nodes[-1].children or len(path) != self.max_depth \
+                or nodes[-1].colour == colour:
+            return False
+        self._replace(path, nodes, _leaf(colour))
+        return True
+
+    def combine(self, path: Sequence[int]) -> bool:
+        """Turn the block at <path> into a leaf based on the majority colour of
+        its children, with the same rules as Block.combine.
+
+        Return True iff the block was turned into a leaf.
+        """
+        nodes = self._path_nodes(path)
+        if not nodes[-1].children or len(path) != self.max_depth - 1:
+            return False
+        colour = _majority_colour(nodes[-1])
+        if colour is None:
+            return False
+        self._replace(path, nodes, _leaf(colour))
+        return True
+
+    def create_copy(self) -> PersistentBoard:
+        """Return a copy of this board in constant time.
+
+        The copy shares all its nodes with this board. Moves on either board
+        do not affect the other.
+        """
+        copy = PersistentBoard.__new__(PersistentBoard)
+        copy.position = self.position
+        copy.size = self.size
+        copy.max_depth = self.max_depth
+        copy._root = self._root
+        return copy
+
+    def to_block(self) -> Block:
+        """Return a new Block tree equivalent to this board.
+        """
+        root = Block(self.position, self.size, None, 0, self.max_depth)
+        stack = [(root, self._root)]
+        while stack:
+            block, node = stack.pop()
+            if not node.children:
+                block.colour = node.colour
+            else:
+                positions = block._children_positions()
+                child_size = block._child_size()
+                children = _children_of(node)
+                new_children = []
+                for i in range(4):
+                    child = Block(positions[i], child_size, None,
+                                  block.level + 1, block.max_depth)
+                    new_children.append(child)
+                    stack.append((child, children[i]))
+                block.children = new_children
+        return root
+
+    @staticmethod
+    def from_block(block: Block) -> PersistentBoard:
+        """Return a new PersistentBoard equivalent to <block>.
+
+        <block> becomes the root of the new board, at level 0.
+        """
+        board = PersistentBoard(block.position, block.size, COLOUR_LIST[0],
+                                block.max_depth - block.level)
+        board._root = _node_from_block(block)
+        return board
+
+
+def _node_from_block(block: Block) -> _Node:
+    """Return the node equivalent to <block> and its descendants.
+    """
+    if not block.children:
+        return _leaf(block.colour)
+    return _Node(None, tuple(_node_from_block(child)
+                             for child in block.children), 0)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'random', 'typing', '__future__', 'math',
+            'block', 'settings'
+        ],
+        'max-attributes': 15
+    })
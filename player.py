@@ -22,15 +22,22 @@ Misha Schwartz, and Jaisie Sin.
 This file contains the hierarchy of player classes.
 """
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional, Tuple
 import random
+import time
 import pygame
 
 from block import Block
+from cache import ScoreCache
 from goal import Goal, generate_goals
+from journal import apply_move
+from mcts import MonteCarloSearch, SearchNode
+from moves import block_at, legal_moves, random_move, sample_moves
+from serialize import decode_board, encode_board
+from traversal import path_to_point
 
-from actions import KEY_ACTION, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE
+from actions import KEY_ACTION, PASS
 
 
 def create_players(num_human: int, num_random: int, smart_players: List[int]) \
@@ -79,20 +86,10 @@ def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
     Preconditions:
         - 0 <= level <= max_depth
     """
-    x_co, y_co = block.position
-    size = block.size
-    is_in_block = False
-    if block.level > level:
-        return None
-    if x_co <= location[0] < x_co + size and y_co <= location[1] < y_co + size:
-        is_in_block = True
-    if is_in_block and level > block.level and block.children is not None:
-        for child in block.children:
-            if _get_block(child, location, level) is not None:
-                return _get_block(child, location, level)
-    if is_in_block:
-        return block
-    return None
+    deepest = None
+    for deepest in path_to_point(block, location, level):
+        pass
+    return deepest
 
 
 class Player:
@@ -142,65 +139,18 @@ class Player:
 
     def _create_valid_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
-        """Generates a random valid move on <board> and returns it"""
-        is_valid = False
-
-        possible_moves = {ROTATE_CLOCKWISE: ('rotate', 1),
-                          ROTATE_COUNTER_CLOCKWISE: ('rotate', 3),
-                          SWAP_HORIZONTAL: ('swap', 0),
-                          SWAP_VERTICAL: ('swap', 1), SMASH: ('smash', None),
-                          COMBINE: ('combine', None), PAINT: ('paint', None)}
-        block_to_move = 0
-        move = ('swap', 1)
-        while not is_valid:
-            random_level = random.randint(0, board.max_depth)
-            counter = 0
-            block_to_move = board.create_copy()
-            has_kids = True
-            if not block_to_move.children:
-                has_kids = False
-            while counter < random_level and has_kids:
-                block_to_move = block_to_move.children[random.randint(0, 3)]
-                if not block_to_move.children:
-                    has_kids = False
-                counter += 1
-            num = random.randint(0, len(possible_moves) - 1)
-            if num == 0:
-                move = possible_moves[ROTATE_CLOCKWISE]
-            elif num == 1:
-                move = possible_moves[ROTATE_COUNTER_CLOCKWISE]
-            elif num == 2:
-                move = possible_moves[SWAP_VERTICAL]
-            elif num == 3:
-                move = possible_moves[SWAP_HORIZONTAL]
-            elif num == 4:
-                move = possible_moves[SMASH]
-            elif num == 5:
-                move = possible_moves[COMBINE]
-            else:
-                move = possible_moves[PAINT]
-            if move == possible_moves[ROTATE_CLOCKWISE] \
-                    and block_to_move.rotate(move[0]) is True:
-                is_valid = True
-            elif move == possible_moves[ROTATE_COUNTER_CLOCKWISE] \
-                    and block_to_move.rotate((move[1])) is True:
-                is_valid = True
-            elif move == possible_moves[SWAP_HORIZONTAL] \
-                    and block_to_move.swap(0):
-                is_valid = True
-            elif move == possible_moves[SWAP_VERTICAL] \
-                    and block_to_move.swap(1):
-                is_valid = True
-            elif move == possible_moves[SMASH] and block_to_move.smash():
-                is_valid = True
-            elif move == possible_moves[COMBINE] and block_to_move.combine():
-                is_valid = True
-            elif move == possible_moves[PAINT] and block_to_move.paint(
-                    self.goal.colour):
-                is_valid = True
-        block_to_moved = _get_block(board, block_to_move.position,
-                                    block_to_move.level)
-        return move[0], move[1], block_to_moved
+        """Generates a random valid move on <board> and returns it
+
+        The move is drawn uniformly from every legal move on <board>, or is a
+        PASS if there are none.
+        """
+        move = random_move(legal_moves(board, self.goal.colour))
+        if move is None:
+            return PASS[0], PASS[1], board
+        # Moves tried on other blocks may have left orientations pending on
+        # the ancestors, so bring the position of the block up to date.
+        move[2].refresh()
+        return move
 
 
 def _create_move(action: Tuple[str, Optional[int]], block: Block) -> \
@@ -335,33 +285,138 @@ class RandomPlayer(Player):
         return self._create_valid_move(board)
 
 
+def _score_move(board: Block, goal: Goal,
+                move: Tuple[str, Optional[int], Block]) -> int:
+    """Perform <move> on <board>, return the score of <goal> on the result
+    and then undo the move.
+
+    Precondition: <move> is a legal move on <board>, as listed by legal_moves
+    for the colour of <goal>.
+    """
+    token = apply_move(move, goal.colour)
+    value = goal.score(board)
+    token.undo()
+    return value
+
+
+def _evaluate_candidates(encoded: bytes, goal: Goal, count: Optional[int],
+                         deadline: Optional[float], seed: int, shard: int,
+                         shards: int) \
+        -> Tuple[Optional[Tuple[int, str, Optional[int], List[int]]], int]:
+    """Score <count> legal moves drawn by sample_moves on the board that
+    encode_board turned into <encoded>, stopping early at the time.time()
+    <deadline> if there is one.
+
+    Return the best move as a tuple of its score, action, direction and the
+    path to its block, or None if no move was scored, together with the
+    number of moves scored.
+
+    The moves are drawn from every <shards>th legal move, starting at
+    <shard>, so that workers with different shards never score the same move.
+
+    This runs in a worker process of a parallel SmartPlayer. The random number
+    generator is seeded with <seed> first, so the same arguments always give
+    the same result. Of the moves with the best score, the first is returned.
+    """
+    random.seed(seed)
+    board = decode_board(encoded)
+    moves = legal_moves(board, goal.colour)[shard::shards]
+    best = None
+    evaluated = 0
+    for move in sample_moves(moves, count):
+        if deadline is not None and time.time() >= deadline:
+            break
+        value = _score_move(board, goal, move)
+        evaluated += 1
+        if best is None or value > best[0]:
+            best = (value, move[0], move[1], move[2].path())
+    return best, evaluated
+
+
 class SmartPlayer(Player):
     """This player generates a certain number of random moves (the amount
     depends on the difficulty) and chooses the one with the best outcome for the
     score
 
+    Candidates are drawn without replacement, apart from smashes, so no move is
+    scored twice in a turn. Once the difficulty reaches the number of legal
+    moves, every legal move is scored once, and the rest of the difficulty is
+    spent on more random outcomes of the legal smashes.
+
+    With a time budget, the difficulty is ignored: candidates are scored until
+    the budget runs out, and the best found by then is chosen.
+
+    With more than one worker, the candidates are split between a pool of
+    worker processes. Each worker is sent the board as encoded by
+    encode_board and a seed of its own, and sends back its best candidate.
+    The pool is started on the first turn and stays open until close is
+    called.
+
     === Public Attributes ===
     id:
         This player's number.
     goal:
         This player's assigned goal for the game.
+    evaluated:
+        The number of candidates scored on this player's last turn.
     """
     # === Private Attributes ===
     # _proceed:
     #   True when the player should make a move, False when the player should
     #   wait.
+    # _time_budget:
+    #   The number of milliseconds a turn may spend scoring candidates, or
+    #   None to score <_difficulty> candidates.
     # _difficulty:
     #   The number of potential moves the player will look through to find the
     #   best from
+    # _workers:
+    #   The number of worker processes the candidates are split between, or 0
+    #   or 1 to score them all in this process.
+    # _pool:
+    #   The pool of worker processes, or None if it has not been started.
+    # _seeds:
+    #   The random number generator that seeds the workers on every turn, or
+    #   None if no seed was given and the pool has not been started.
+    # _cache:
+    #   The scores of the boards this player has started a turn on. Candidate
+    #   moves are scored without it, since hashing every candidate board
+    #   costs more than scoring it incrementally.
     id: int
     goal: Goal
+    evaluated: int
     _proceed: bool
+    _time_budget: Optional[int]
     _difficulty: int
-
-    def __init__(self, player_id: int, goal: Goal, difficulty: int) -> None:
+    _cache: ScoreCache
+    _workers: int
+    _pool: Optional[ProcessPoolExecutor]
+    _seeds: Optional[random.Random]
+
+    def __init__(self, player_id: int, goal: Goal, difficulty: int,
+                 workers: int = 0, seed: Optional[int] = None,
+                 time_budget: Optional[int] = None) -> None:
+        """Initialize this SmartPlayer to score <difficulty> candidates a
+        turn, or as many as it can in <time_budget> milliseconds if
+        <time_budget> is not None, split between <workers> worker processes
+        if there is more than one.
+
+        <seed> seeds the workers, so that a player with the same seed makes
+        the same moves on the same boards. If it is None, the workers are
+        seeded from the random module when the pool is started, so a player
+        that scores its candidates in this process never draws from it.
+        """
         Player.__init__(self, player_id, goal)
+        self.evaluated = 0
+        self._time_budget = time_budget
         self._difficulty = difficulty
         self._proceed = False
+        self._cache = ScoreCache()
+        self._workers = workers
+        self._pool = None
+        self._seeds = None
+        if seed is not None:
+            self._seeds = random.Random(seed)
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         """Doesn't use board, just returns None
@@ -384,45 +439,190 @@ class SmartPlayer(Player):
         performed on the <board>. If no move can be found that is better than
         the current score, this player will pass.
 
-        This function does not mutate <board>.
+        Each candidate move is applied to <board> and then undone, so <board>
+        is left unchanged.
         """
         if not self._proceed:
             return None
-        current_score = self.goal.score(board)
+        current_score = self._cache.score(board, self.goal)
+        count = self._difficulty
+        deadline = None
+        if self._time_budget is not None:
+            count = None
+            deadline = time.time() + self._time_budget / 1000
+        if self._workers > 1:
+            move_to_do = self._parallel_move(board, current_score, count,
+                                             deadline)
+            move_to_do[2].refresh()
+            self._proceed = False
+            return move_to_do
         move_to_do = PASS[0], PASS[1], board
-        counter = 0
-        while counter < self._difficulty:
-            copy = board.create_copy()
-            move = self._create_valid_move(copy)
-            potential_score = self._check_possible_score(copy, move)
+        # The legal moves are listed once, and stay legal as each candidate
+        # is applied and undone.
+        moves = legal_moves(board, self.goal.colour)
+        self.evaluated = 0
+        for move in sample_moves(moves, count):
+            if deadline is not None and time.time() >= deadline:
+                break
+            self.evaluated += 1
+            potential_score = _score_move(board, self.goal, move)
             if potential_score > \
                     current_score:
                 move_to_do = move
                 current_score = potential_score
-            counter += 1
+        move_to_do[2].refresh()
         self._proceed = False
-        if move_to_do != (PASS[0], PASS[1], board):
-            block_to_move = _get_block(board, move_to_do[2].position,
-                                       move_to_do[2].level)
-            return move_to_do[0], move_to_do[1], block_to_move
         return move_to_do
 
-    def _check_possible_score(self, copy: Block,
-                              move: Tuple[str, Optional[int], Block]) -> int:
-        """Performs <move> on a copy of <board> and returns the score of
-        that move"""
-        if (move[0], move[1]) in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-            move[2].rotate(move[1])
-        elif (move[0], move[1]) in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
-            move[2].swap(move[1])
-        elif (move[0], move[1]) == SMASH:
-            move[2].smash()
-        elif (move[0], move[1]) == PAINT:
-            move[2].paint(self.goal.colour)
-        elif (move[0], move[1]) == COMBINE:
-            move[2].combine()
-        value = self.goal.score(copy)
-        return value
+    def _parallel_move(self, board: Block, current_score: int,
+                       count: Optional[int], deadline: Optional[float]) \
+            -> Tuple[str, Optional[int], Block]:
+        """Return the best of <count> candidates scored by the workers, or of
+        those scored by the time.time() <deadline>, or a PASS if none of them
+        beats <current_score>.
+
+        The workers are asked in order and a worker's best candidate must beat
+        those of the workers before it, so that ties go to the earliest
+        candidate as they do when the candidates are scored in this process.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._workers)
+        if self._seeds is None:
+            self._seeds = random.Random(random.getrandbits(64))
+        encoded = encode_board(board)
+        base = self._seeds.getrandbits(32)
+        futures = []
+        for i in range(self._workers):
+            share = None
+            if count is not None:
+                share = count // self._workers + (i < count % self._workers)
+            futures.append(self._pool.submit(_evaluate_candidates, encoded,
+                                             self.goal, share, deadline,
+                                             base + i, i, self._workers))
+        move_to_do = PASS[0], PASS[1], board
+        self.evaluated = 0
+        for future in futures:
+            result, evaluated = future.result()
+            self.evaluated += evaluated
+            if result is not None and result[0] > current_score:
+                current_score = result[0]
+                move_to_do = result[1], result[2], block_at(board, result[3])
+        return move_to_do
+
+    def close(self) -> None:
+        """Shut down the worker processes of this player, if any were
+        started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class MCTSPlayer(Player):
+    """A player that looks ahead over the next turns of every player with
+    Monte Carlo Tree Search, and makes the move it visited most.
+
+    The search plays the opponents with the goals it is given, and counts the
+    penalties of smash, combine and paint against the player who makes them.
+    The tree is kept between turns, and is reused when the board at the
+    start of a turn is one that the search has already reached.
+
+    === Public Attributes ===
+    id:
+        This player's number.
+    goal:
+        This player's assigned goal for the game.
+    playouts:
+        The number of playouts run on this player's last turn.
+    """
+    # === Private Attributes ===
+    # _proceed:
+    #   True when the player should make a move, False when the player should
+    #   wait.
+    # _search:
+    #   The search, for this player's goal followed by the goals of the
+    #   opponents in turn order.
+    # _iterations:
+    #   The number of playouts run each turn, or None to use the time budget.
+    # _time_budget:
+    #   The number of milliseconds each turn may search for, or None.
+    # _tree:
+    #   The node that the move made on the last turn led to, or None.
+    id: int
+    goal: Goal
+    playouts: int
+    _proceed: bool
+    _search: MonteCarloSearch
+    _iterations: Optional[int]
+    _time_budget: Optional[int]
+    _tree: Optional[SearchNode]
+
+    def __init__(self, player_id: int, goal: Goal,
+                 opponents: Optional[List[Goal]] = None,
+                 iterations: Optional[int] = 1000,
+                 time_budget: Optional[int] = None,
+                 horizon: Optional[int] = None) -> None:
+        """Initialize this MCTSPlayer.
+
+        <opponents> are the goals of the players that move after this player,
+        in turn order. Each turn runs <iterations> playouts, or as many as
+        fit in <time_budget> milliseconds if <time_budget> is not None. The
+        search looks <horizon> turns ahead, which is two turns of every
+        player if it is None.
+        """
+        Player.__init__(self, player_id, goal)
+        goals = [goal] + (opponents or [])
+        if horizon is None:
+            horizon = 2 * len(goals)
+        self.playouts = 0
+        self._proceed = False
+        self._search = MonteCarloSearch(goals, horizon)
+        self._iterations = iterations
+        self._time_budget = time_budget
+        self._tree = None
+
+    def get_selected_block(self, board: Block) -> Optional[Block]:
+        """Doesn't use board, just returns None
+        """
+        return None
+
+    def process_event(self, event: pygame.event.Event) -> None:
+        """Determines whether the player is making a move or not
+        """
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self._proceed = True
+
+    def generate_move(self, board: Block) ->\
+            Optional[Tuple[str, Optional[int], Block]]:
+        """Return the move this player visited most in its search from
+        <board>, or a PASS if the search found that passing is best or found
+        no moves.
+
+        Every move tried by the search is undone, so <board> is left
+        unchanged.
+        """
+        if not self._proceed:
+            return None
+        self._proceed = False
+        root = None
+        if self._tree is not None:
+            root = self._search.find(self._tree, board)
+        if root is None:
+            root = self._search.new_root(board)
+        iterations = self._iterations
+        deadline = None
+        if self._time_budget is not None:
+            iterations = None
+            deadline = time.time() + self._time_budget / 1000
+        self.playouts = self._search.run(board, root, iterations, deadline)
+
+        best = self._search.best_move(root)
+        self._tree = best
+        if best is None or best.move[0] == PASS[0]:
+            return PASS[0], PASS[1], board
+        block = block_at(board, list(best.move[2]))
+        block.refresh()
+        return best.move[0], best.move[1], block
 
 
 if __name__ == '__main__':
@@ -431,8 +631,9 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-io': ['process_event'],
         'allowed-import-modules': [
-            'doctest', 'python_ta', 'random', 'typing', 'actions', 'block',
-            'goal', 'pygame', '__future__'
+            'doctest', 'python_ta', 'random', 'time', 'typing', 'actions',
+            'block', 'goal', 'journal', 'mcts', 'moves', 'serialize',
+            'traversal', 'pygame', '__future__', 'cache', 'concurrent.futures'
         ],
         'max-attributes': 10,
         'generated-members': 'pygame.*'
@@ -29,7 +29,7 @@ from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
     PAINT, PASS
 from settings import BACKGROUND_COLOUR, TEXT_COLOUR, OUTLINE_THICKNESS, \
     OUTLINE_COLOUR, HIGHLIGHT_THICKNESS, HIGHLIGHT_COLOUR, COLOUR_LIST, \
-    colour_name
+    colour_name, colour_rgb
 
 Y_FONT_PADDING = 2
 
@@ -112,7 +112,7 @@ def _print_colours(x: int, y: int, text_height: int,
     y += text_height + Y_FONT_PADDING
 
     for c in COLOUR_LIST:
-        _print_to_image(colour_name(c), x, y, font, image, c)
+        _print_to_image(colour_name(c), x, y, font, image, colour_rgb(c))
         y += text_height + Y_FONT_PADDING
 
     return y
@@ -204,13 +204,14 @@ class Renderer:
             image = pygame.transform.scale(image, (size, size))
             self._screen.blit(image, pos)
 
-    def draw_board(self, squares: List[Tuple[Tuple[int, int, int],
-                                             Tuple[int, int], int]]) -> None:
-        """Draw each block in blocks onto the screen.
+    def draw_board(self, squares: List[Tuple[int, Tuple[int, int], int]]) \
+            -> None:
+        """Draw each block in blocks onto the screen, in the RGB colour of its
+        palette index.
         """
         for colour, pos, size in squares:
             rect = (pos[0], pos[1], size, size)
-            pygame.draw.rect(self._screen, colour, rect, 0)
+            pygame.draw.rect(self._screen, colour_rgb(colour), rect, 0)
             pygame.draw.rect(self._screen, OUTLINE_COLOUR, rect,
                              OUTLINE_THICKNESS)
 
@@ -0,0 +1,327 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a compact binary encoding of boards, and a corpus file
+format that stores many encoded boards.
+
+=== Board encoding ===
+An encoded board starts with a header of six little-endian unsigned integers:
+max_depth (1 byte), level (1 byte), the number of bits per colour (1 byte),
+size (2 bytes) and the x and y of the position (2 bytes each).
+
+The header is followed by the blocks of the board in pre-order, as a stream of
+bits with the most significant bit of each byte first. Every block below
+max_depth starts with one bit that is 1 for a parent and 0 for a leaf; blocks
+at max_depth are always leaves and have no such bit. Every leaf is followed by
+its colour, which is its index in the palette. The last byte is padded with
+zeros.
+
+=== Corpus files ===
+A corpus file starts with a 24-byte header: the magic bytes b'BLKC', a format
+version byte, three padding bytes, then the number of boards and the offset of
+the index as little-endian 8-byte integers. The encoded boards follow one
+after the other, and the index at the end of the file holds the offset of the
+start of every board plus the offset of the end of the last one.
+
+A CorpusReader maps the file into memory, so reading a board only touches the
+bytes of that board.
+"""
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional
+import mmap
+import os
+import struct
+
+from block import Block
+from settings import COLOUR_LIST
+
+_BOARD_HEADER = struct.Struct('<BBBHHH')
+_CORPUS_HEADER = struct.Struct('<4sBxxxQQ')
+_OFFSET = struct.Struct('<Q')
+_MAGIC = b'BLKC'
+_VERSION = 1
+
+
+def _colour_bits() -> int:
+    """Return the number of bits used to store one colour index.
+    """
+    return max(1, (len(COLOUR_LIST) - 1).bit_length())
+
+
+class _BitWriter:
+    """A stream of bits written into a bytearray, most significant bit first.
+    """
+    # === Private Attributes ===
+    # _data:
+    #   The bytes written so far.
+    # _pending:
+    #   The bits that do not fill a whole byte yet.
+    # _count:
+    #   The number of bits in <_pending>.
+    _data: bytearray
+    _pending: int
+    _count: int
+
+    def __init__(self, data: bytearray) -> None:
+        """Initialize this writer to append to <data>.
+        """
+        self._data = data
+        self._pending = 0
+        self._count = 0
+
+    def write(self, value: int, bits: int) -> None:
+        """Write the lowest <bits> bits of <value>.
+        """
+        self._pending = (self._pending << bits) | value
+        self._count += bits
+        while self._count >= 8:
+            self._count -= 8
+            self._data.append((self._pending >> self._count) & 0xFF)
+        self._pending &= (1 << self._count) - 1
+
+    def flush(self) -> None:
+        """Write the pending bits, padded with zeros to a whole byte.
+        """
+        if self._count:
+            self._data.append((self._pending << (8 - self._count)) & 0xFF)
+            self._pending = 0
+            self._count = 0
+
+
+class _BitReader:
+    """A stream of bits read from a bytes-like object, most significant bit
+    first.
+    """
+    # === Private Attributes ===
+    # _data:
+    #   The bytes to read from.
+    # _position:
+    #   The index of the next bit to read.
+    _data: memoryview
+    _position: int
+
+    def __init__(self, data: memoryview, start: int) -> None:
+        """Initialize this reader to read <data> from byte <start>.
+        """
+        self._data = data
+        self._position = start * 8
+
+    def read(self, bits: int) -> int:
+        """Read and return the next <bits> bits as an integer.
+        """
+        value = 0
+        for _ in range(bits):
+            byte = self._data[self._position >> 3]
+            bit = (byte >> (7 - (self._position & 7))) & 1
+            value = (value << 1) | bit
+            self._position += 1
+        return value
+
+
+def encode_board(board: Block) -> bytes:
+    """Return the compact binary encoding of <board>.
+    """
+    bits = _colour_bits()
+    data = bytearray(_BOARD_HEADER.pack(board.max_depth, board.level, bits,
+                                        board.size, board.position[0],
+                                        board.position[1]))
+    writer = _BitWriter(data)
+    stack = [board]
+    while stack:
+        block = stack.pop()
+        children = block.children
+        if block.level < block.max_depth:
+            writer.write(1 if children else 0, 1)
+        if children:
+            stack.append(children[3])
+            stack.append(children[2])
+            stack.append(children[1])
+            stack.append(children[0])
+        else:
+            writer.write(block.colour, bits)
+    writer.flush()
+    return bytes(data)
+
+
+def decode_board(data: bytes) -> Block:
+    """Return the Block encoded in <data> by encode_board.
+
+    <data> may be any bytes-like object, such as a slice of a memory map.
+    """
+    view = memoryview(data)
+    max_depth, level, bits, size, x, y = _BOARD_HEADER.unpack_from(view)
+    reader = _BitReader(view, _BOARD_HEADER.size)
+    board = Block((x, y), size, None, level, max_depth)
+    stack = [board]
+    while stack:
+        block = stack.pop()
+        if block.level < max_depth and reader.read(1):
+            positions = block._children_positions()
+            child_size = block._child_size()
+            children = []
+            for i in range(4):
+                children.append(Block(positions[i], child_size, None,
+                                      block.level + 1, max_depth))
+            block.children = children
+            stack.append(children[3])
+            stack.append(children[2])
+            stack.append(children[1])
+            stack.append(children[0])
+        else:
+            block.colour = reader.read(bits)
+    return board
+
+
+def write_corpus(path: str, boards: Iterable[Block]) -> int:
+    """Write every board in <boards> to a new corpus file at <path>, and
+    return the number of boards written.
+    """
+    offsets = []
+    with open(path, 'wb') as corpus:
+        corpus.write(_CORPUS_HEADER.pack(_MAGIC, _VERSION, 0, 0))
+        offset = _CORPUS_HEADER.size
+        for board in boards:
+            encoded = encode_board(board)
+            offsets.append(offset)
+            corpus.write(encoded)
+            offset += len(encoded)
+        offsets.append(offset)
+        for start in offsets:
+            corpus.write(_OFFSET.pack(start))
+        corpus.seek(0)
+        corpus.write(_CORPUS_HEADER.pack(_MAGIC, _VERSION, len(offsets) - 1,
+                                         offset))
+    return len(offsets) - 1
+
+
+class CorpusReader:
+    """Random access to the boards of a corpus file, through a read-only
+    memory map of the file.
+
+    A CorpusReader can be used in a with statement, which closes it at the
+    end.
+    """
+    # === Private Attributes ===
+    # _file:
+    #   The open corpus file.
+    # _map:
+    #   The memory map of the whole file, or None if the file was not mapped.
+    # _count:
+    #   The number of boards in the corpus.
+    # _index:
+    #   The offset of the index in the file.
+    _map: Optional[mmap.mmap]
+    _count: int
+    _index: int
+
+    def __init__(self, path: str) -> None:
+        """Open the corpus file at <path>.
+
+        Raise a ValueError if the file is not a corpus file. The file is
+        closed again in that case.
+        """
+        self._file = open(path, 'rb')
+        self._map = None
+        try:
+            if os.fstat(self._file.fileno()).st_size < _CORPUS_HEADER.size:
+                raise ValueError(f'{path} is not a board corpus file')
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            magic, version, self._count, self._index = \
+                _CORPUS_HEADER.unpack_from(self._map)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f'{path} is not a board corpus file')
+        except (ValueError, OSError, struct.error) as error:
+            self.close()
+            if isinstance(error, ValueError):
+                raise
+            raise ValueError(f'{path} is not a board corpus file') from error
+
+    def __enter__(self) -> CorpusReader:
+        """Return this reader.
+        """
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close this reader.
+        """
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of boards in the corpus.
+        """
+        return self._count
+
+    def raw(self, index: int) -> memoryview:
+        """Return the encoded board at <index>, as a view of the memory map
+        that does not copy it.
+        """
+        if not 0 <= index < self._count:
+            raise IndexError('corpus index out of range')
+        start, = _OFFSET.unpack_from(self._map, self._index + 8 * index)
+        end, = _OFFSET.unpack_from(self._map, self._index + 8 * index + 8)
+        return memoryview(self._map)[start:end]
+
+    def __getitem__(self, index: int) -> Block:
+        """Return the board at <index>.
+        """
+        view = self.raw(index)
+        try:
+            return decode_board(view)
+        finally:
+            view.release()
+
+    def __iter__(self) -> Iterator[Block]:
+        """Yield every board in the corpus in order.
+        """
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self) -> None:
+        """Close the memory map and the file.
+
+        Every view returned by raw must be released first, since a memory map
+        cannot be closed while it is exported: close raises a BufferError
+        otherwise.
+        """
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def read_corpus(path: str) -> List[Block]:
+    """Return every board in the corpus file at <path>.
+    """
+    with CorpusReader(path) as reader:
+        return list(reader)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['write_corpus', '__init__'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'mmap', 'os',
+            'struct', 'block', 'settings'
+        ],
+        'max-attributes': 15
+    })
@@ -21,7 +21,7 @@ Misha Schwartz, and Jaisie Sin.
 
 This file contains the global settings for the blocky game.
 """
-from typing import Tuple
+from typing import List, Tuple
 
 # Colours that we could use in the game
 WHITE = (255, 255, 255)
@@ -33,8 +33,18 @@ MELON_MAMBO = (234, 62, 112)
 DAFFODIL_DELIGHT = (255, 211, 92)
 TEMPTING_TURQUOISE = (75, 196, 213)
 
-# A pallette of the colours we use in the game
-COLOUR_LIST = [PACIFIC_POINT, REAL_RED, OLD_OLIVE, DAFFODIL_DELIGHT]
+# A pallette of the colours we use in the game. The game stores every colour
+# as its index in PALETTE, and only looks up its RGB value to draw it.
+PALETTE = [PACIFIC_POINT, REAL_RED, OLD_OLIVE, DAFFODIL_DELIGHT]
+# The name of each colour in PALETTE.
+PALETTE_NAMES = ['Pacific Point', 'Real Red', 'Old Olive', 'Daffodil Delight']
+# The colours we use in the game, as indices into PALETTE.
+COLOUR_LIST = list(range(len(PALETTE)))
+
+# Colour indices are stored in one byte by the compact boards, the NumPy bulk
+# generator and goal._flatten_indices, and 255 is kept to mark a block with
+# children.
+MAX_PALETTE_SIZE = 255
 
 # The game board will be a square with this size.
 BOARD_SIZE = 750
@@ -56,23 +66,47 @@ HIGHLIGHT_THICKNESS = 5
 ANIMATION_DURATION = 1
 
 
-def colour_name(colour: Tuple[int, int, int]) -> str:
-    """Return the colour name associated with this colour value, or the empty
-    string if this colour value isn't in our colour list.
+def set_palette(colours: List[Tuple[int, int, int]],
+                names: List[str]) -> None:
+    """Use the RGB values <colours>, called <names>, as the palette of the
+    game, so that colour i is <colours>[i].
+
+    PALETTE, PALETTE_NAMES and COLOUR_LIST are changed in place, so modules
+    that imported them see the new palette. Boards and goals made with the old
+    palette must not be used afterwards.
+
+    Raise a ValueError if the palette is empty or too large, or if <names> is
+    not the same length as <colours>.
+    """
+    if not 0 < len(colours) <= MAX_PALETTE_SIZE:
+        raise ValueError(f'a palette must have 1 to {MAX_PALETTE_SIZE} '
+                         f'colours')
+    if len(names) != len(colours):
+        raise ValueError('a palette must have one name for each colour')
+    PALETTE[:] = colours
+    PALETTE_NAMES[:] = names
+    COLOUR_LIST[:] = range(len(colours))
+
+
+def colour_rgb(colour: int) -> Tuple[int, int, int]:
+    """Return the RGB value of the colour with index <colour> in the palette.
+
+    >>> colour_rgb(0)
+    (1, 128, 181)
+    """
+    return PALETTE[colour]
+
+
+def colour_name(colour: int) -> str:
+    """Return the colour name associated with this colour index, or the empty
+    string if this colour index isn't in our palette.
 
-    >>> colour_name((1, 128, 181))
+    >>> colour_name(0)
     'Pacific Point'
-    >>> colour_name(PACIFIC_POINT)
+    >>> colour_name(PALETTE.index(PACIFIC_POINT))
     'Pacific Point'
     """
-    colour_names = {
-        PACIFIC_POINT: 'Pacific Point',
-        REAL_RED: 'Real Red',
-        OLD_OLIVE: 'Old Olive',
-        DAFFODIL_DELIGHT: 'Daffodil Delight'
-    }
-
-    if colour in colour_names:
-        return colour_names[colour]
+    if colour in COLOUR_LIST:
+        return PALETTE_NAMES[colour]
     else:
         return ''
@@ -0,0 +1,242 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains generators that walk a Block tree without recursion.
+
+Each walker keeps a single explicit stack or queue and yields the blocks one
+at a time, so deep boards do not reach the recursion limit and no list is
+built for each level of the tree.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterator, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from block import Block
+
+
+def preorder(block: Block) -> Iterator[Block]:
+    """Yield <block> and all its descendants in pre-order.
+
+    A parent is yielded before its children, and children are yielded in the
+    order upper-right, upper-left, lower-left, lower-right.
+    """
+    stack = [block]
+    while stack:
+        current = stack.pop()
+        yield current
+        children = current.children
+        if children:
+            stack.append(children[3])
+            stack.append(children[2])
+            stack.append(children[1])
+            stack.append(children[0])
+
+
+def preorder_pairs(first: Block, second: Block) -> Iterator[Tuple[Block,
+                                                                  Block]]:
+    """Yield the pairs of blocks at the same place in <first> and <second>, in
+    pre-order.
+
+    The walk only goes into the children of a pair when both blocks of the
+    pair have children.
+    """
+    stack = [(first, second)]
+    while stack:
+        mine, theirs = stack.pop()
+        yield mine, theirs
+        mine_children = mine.children
+        theirs_children = theirs.children
+        if mine_children and theirs_children:
+            for i in range(3, -1, -1):
+                stack.append((mine_children[i], theirs_children[i]))
+
+
+def leaves(block: Block) -> Iterator[Block]:
+    """Yield every descendant of <block> that has no children, or <block>
+    itself if it has no children, in pre-order.
+    """
+    for current in preorder(block):
+        if not current.children:
+            yield current
+
+
+def level_order(block: Block) -> Iterator[Block]:
+    """Yield <block> and all its descendants one level at a time, starting
+    with <block>.
+    """
+    queue = deque([block])
+    while queue:
+        current = queue.popleft()
+        yield current
+        queue.extend(current.children)
+
+
+def leaf_cells(block: Block) -> Iterator[Tuple[Block, int, int, int]]:
+    """Yield a tuple (leaf, x, y, cells) for every leaf of <block>.
+
+    <x> and <y> are the column and row of the upper left unit cell of the
+    leaf, and the leaf is <cells> by <cells> unit cells. Unit cells are the
+    size of a block at max_depth, and the upper left unit cell of <block> is
+    at column 0 and row 0.
+    """
+    stack = [(block, 0, 0, 2 ** (block.max_depth - block.level))]
+    while stack:
+        current, x, y, cells = stack.pop()
+        children = current.children
+        if not children:
+            yield current, x, y, cells
+        else:
+            half = cells // 2
+            stack.append((children[3], x + half, y + half, half))
+            stack.append((children[2], x, y + half, half))
+            stack.append((children[1], x, y, half))
+            stack.append((children[0], x + half, y, half))
+
+
+def edge_leaf_cells(block: Block) -> Iterator[Tuple[Block, int, int, int]]:
+    """Yield a tuple (leaf, x, y, cells) as in leaf_cells, for only the leaves
+    of <block> that touch an edge of <block>.
+
+    Subtrees that do not touch an edge are skipped without being visited.
+    """
+    total = 2 ** (block.max_depth - block.level)
+    stack = [(block, 0, 0, total)]
+    while stack:
+        current, x, y, cells = stack.pop()
+        children = current.children
+        if not children:
+            yield current, x, y, cells
+            continue
+        half = cells // 2
+        for child, child_x, child_y in [(children[3], x + half, y + half),
+                                        (children[2], x, y + half),
+                                        (children[1], x, y),
+                                        (children[0], x + half, y)]:
+            if child_x == 0 or child_y == 0 or child_x + half == total \
+                    or child_y + half == total:
+                stack.append((child, child_x, child_y, half))
+
+
+def path_to_cell(block: Block, column: int, row: int,
+                 level: int) -> Iterator[Block]:
+    """Yield the blocks within <block> that include the unit cell at <column>
+    and <row>, from <block> down to the deepest such block that is at or
+    above <level>.
+
+    The upper left unit cell of <block> is at column 0 and row 0. Nothing is
+    yielded if the cell is outside <block> or <block> is below <level>.
+    """
+    cells = 2 ** (block.max_depth - block.level)
+    if block.level > level or not (0 <= column < cells and 0 <= row < cells):
+        return
+    current = block
+    while current is not None:
+        yield current
+        children = current.children
+        if current.level == level or not children:
+            return
+        cells //= 2
+        if row < cells:
+            current = children[1] if column < cells else children[0]
+        else:
+            current = children[2] if column < cells else children[3]
+        column %= cells
+        row %= cells
+
+
+def path_to_point(block: Block, location: Tuple[int, int],
+                  level: int) -> Iterator[Block]:
+    """Yield the blocks within <block> that include <location>, from <block>
+    down to the deepest such block that is at or above <level>.
+
+    <location> is a coordinate-pair (x, y) in pixels. A block includes all
+    locations that are strictly inside of it, as well as locations on the
+    top and left edges. Nothing is yielded if <block> does not include
+    <location> or is below <level>.
+
+    The pixel sizes of blocks are rounded at every level, so the squares of
+    neighbouring leaves can overlap by a pixel. The blocks yielded lead to
+    the leaf drawn last at <location>, which is the one on top when the
+    leaves are drawn in pre-order, so a click always finds the block that is
+    drawn under it.
+    """
+    if block.level > level or not _includes(block, location):
+        return
+    extents = {}
+    # Each entry is a block that may be drawn at <location> and the path to
+    # it from <block>. Children are pushed in pre-order, so the one drawn
+    # last is tried first.
+    stack = [(block, [block])]
+    while stack:
+        current, path = stack.pop()
+        x, y = current.position
+        extent = _drawn_extent(current.size, current.max_depth - current.level,
+                               extents)
+        if not (x <= location[0] < x + extent and
+                y <= location[1] < y + extent):
+            continue
+        children = current.children
+        if not children:
+            if _includes(current, location):
+                yield from path[:level - block.level + 1]
+                return
+            continue
+        for child in children:
+            stack.append((child, path + [child]))
+
+
+def _drawn_extent(size: int, levels: int, extents: Dict[Tuple[int, int],
+                                                        int]) -> int:
+    """Return the largest width in pixels that the leaves of a block of
+    <size> pixels, with <levels> levels below it, can be drawn over, starting
+    from the upper left corner of the block.
+
+    <extents> caches the widths already found, keyed by (size, levels).
+    """
+    key = (size, levels)
+    if key not in extents:
+        extent = size
+        child_size = round(size / 2.0)
+        if levels > 0 and child_size > 0:
+            extent = max(size, child_size + _drawn_extent(child_size,
+                                                          levels - 1, extents))
+        extents[key] = extent
+    return extents[key]
+
+
+def _includes(block: Block, location: Tuple[int, int]) -> bool:
+    """Return True iff <block> includes <location>.
+    """
+    x, y = block.position
+    return x <= location[0] < x + block.size and \
+        y <= location[1] < y + block.size
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'collections',
+            'block'
+        ]
+    })